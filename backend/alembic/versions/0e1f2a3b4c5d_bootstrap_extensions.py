@@ -0,0 +1,28 @@
+"""Install database extensions used by the schema.
+
+Revision ID: 0e1f2a3b4c5d
+Revises:
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0e1f2a3b4c5d"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # citext backs users.email; pgcrypto provides gen_random_bytes for the legacy key backfill.
+    with op.get_context().autocommit_block():
+        op.execute("CREATE EXTENSION IF NOT EXISTS citext")
+        op.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP EXTENSION IF EXISTS pgcrypto")
+        op.execute("DROP EXTENSION IF EXISTS citext")
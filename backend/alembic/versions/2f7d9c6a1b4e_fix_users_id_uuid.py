@@ -5,27 +5,49 @@ Revises: 8c4b1a9d2f7e
 Create Date: 2026-01-27
 """
 from typing import Sequence, Union
+import os
 
 from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.schema_cache import get_inspector, reset_inspector, has_table
+
 
 revision: str = "2f7d9c6a1b4e"
 down_revision: Union[str, Sequence[str], None] = "8c4b1a9d2f7e"
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "10000"))
+
 
-def _has_table(inspector, table: str) -> bool:
-    return table in inspector.get_table_names()
+def _backfill_id_new(bind) -> None:
+    last = ""
+    while last is not None:
+        last = bind.execute(
+            sa.text(
+                """
+                WITH batch AS (
+                    SELECT id FROM users WHERE id > :last ORDER BY id LIMIT :batch_size
+                ), updated AS (
+                    UPDATE users u SET id_new = u.id::uuid
+                    FROM batch b
+                    WHERE u.id = b.id
+                    RETURNING u.id
+                )
+                SELECT max(id) FROM updated
+                """
+            ),
+            {"last": last, "batch_size": BATCH_SIZE},
+        ).scalar()
 
 
 def upgrade() -> None:
     bind = op.get_bind()
-    inspector = sa.inspect(bind)
+    inspector = get_inspector(bind)
 
-    if not _has_table(inspector, "users"):
+    if not has_table(inspector, "users"):
         return
 
     for col in inspector.get_columns("users"):
@@ -45,18 +67,34 @@ def upgrade() -> None:
                 raise RuntimeError(
                     "users.id contains non-UUID values; clean them before migration"
                 )
-            op.execute("ALTER TABLE users ALTER COLUMN id TYPE uuid USING id::uuid")
+
+            # Shadow column instead of ALTER COLUMN TYPE: the backfill and index build
+            # run outside the migration transaction, only the final swap locks the table.
+            op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS id_new uuid")
+            with op.get_context().autocommit_block():
+                _backfill_id_new(bind)
+                op.execute("DROP INDEX CONCURRENTLY IF EXISTS users_id_new_key")
+                op.execute("CREATE UNIQUE INDEX CONCURRENTLY users_id_new_key ON users (id_new)")
+
+            op.execute("LOCK TABLE users IN ACCESS EXCLUSIVE MODE")
+            op.execute("UPDATE users SET id_new = id::uuid WHERE id_new IS NULL")
+            op.execute("ALTER TABLE users DROP CONSTRAINT IF EXISTS users_pkey")
+            op.execute("ALTER TABLE users DROP COLUMN id")
+            op.execute("ALTER TABLE users RENAME COLUMN id_new TO id")
+            op.execute("ALTER TABLE users ADD CONSTRAINT users_pkey PRIMARY KEY USING INDEX users_id_new_key")
+            reset_inspector(bind)
             break
 
 
 def downgrade() -> None:
     bind = op.get_bind()
-    inspector = sa.inspect(bind)
+    inspector = get_inspector(bind)
 
-    if not _has_table(inspector, "users"):
+    if not has_table(inspector, "users"):
         return
 
     for col in inspector.get_columns("users"):
         if col["name"] == "id" and isinstance(col["type"], postgresql.UUID):
             op.execute("ALTER TABLE users ALTER COLUMN id TYPE varchar USING id::text")
+            reset_inspector(bind)
             break
@@ -8,6 +8,8 @@ Create Date: 2026-01-13 22:40:00
 from alembic import op
 import sqlalchemy as sa
 
+from app.schema_cache import get_inspector, reset_inspector, has_column
+
 
 # revision identifiers, used by Alembic.
 revision = "3b8c1a2f6b2d"
@@ -16,16 +18,18 @@ branch_labels = None
 depends_on = None
 
 
-def _has_column(inspector, table: str, column: str) -> bool:
-    return any(col["name"] == column for col in inspector.get_columns(table))
-
-
 def upgrade() -> None:
-    inspector = sa.inspect(op.get_bind())
-    if not _has_column(inspector, "solutions", "conversation_language"):
+    bind = op.get_bind()
+    inspector = get_inspector(bind)
+    changed = False
+    if not has_column(inspector, "solutions", "conversation_language"):
         op.add_column("solutions", sa.Column("conversation_language", sa.String(), nullable=True))
-    if not _has_column(inspector, "solutions", "programming_language"):
+        changed = True
+    if not has_column(inspector, "solutions", "programming_language"):
         op.add_column("solutions", sa.Column("programming_language", sa.String(), nullable=True))
+        changed = True
+    if changed:
+        reset_inspector(bind)
 
 
 def downgrade() -> None:
@@ -0,0 +1,70 @@
+"""Store user_id references as native UUID.
+
+Revision ID: 3d9e5b7a1c42
+Revises: g1b2c3d4e5f6
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.schema_cache import get_inspector, reset_inspector
+
+
+revision: str = "3d9e5b7a1c42"
+down_revision: Union[str, Sequence[str], None] = "g1b2c3d4e5f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Only the user references mirror users.id; solution and API key ids are
+# hex tokens (and solution ids double as Elasticsearch _ids), so they stay text.
+USER_ID_TABLES = ("api_keys", "sub_api_keys", "solutions", "solution_votes")
+
+
+def _user_id_is_uuid(inspector, table: str) -> bool | None:
+    if not inspector.has_table(table):
+        return None
+    for col in inspector.get_columns(table):
+        if col["name"] == "user_id":
+            return isinstance(col["type"], postgresql.UUID)
+    return None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = get_inspector(bind)
+
+    tables = [t for t in USER_ID_TABLES if _user_id_is_uuid(inspector, t) is False]
+    for table in tables:
+        invalid = bind.execute(
+            sa.text(
+                f"""
+                SELECT user_id FROM {table}
+                WHERE user_id !~* '^[0-9a-f]{{8}}-[0-9a-f]{{4}}-[0-9a-f]{{4}}-[0-9a-f]{{4}}-[0-9a-f]{{12}}$'
+                LIMIT 1
+                """
+            )
+        ).fetchone()
+        if invalid:
+            raise RuntimeError(
+                f"{table}.user_id contains non-UUID values; clean them before migration"
+            )
+
+    for table in tables:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN user_id TYPE uuid USING user_id::uuid")
+    if tables:
+        reset_inspector(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = get_inspector(bind)
+
+    tables = [t for t in USER_ID_TABLES if _user_id_is_uuid(inspector, t)]
+    for table in tables:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN user_id TYPE varchar USING user_id::text")
+    if tables:
+        reset_inspector(bind)
@@ -0,0 +1,32 @@
+"""Replace per-column vote indexes with a single score index.
+
+Revision ID: 5c8d2e4f6a10
+Revises: 7a3f1c9e2b56
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "5c8d2e4f6a10"
+down_revision: Union[str, Sequence[str], None] = "7a3f1c9e2b56"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_solutions_score "
+            "ON solutions ((upvotes - downvotes) DESC, created_at DESC)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_solutions_upvotes")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_solutions_downvotes")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_solutions_upvotes ON solutions (upvotes)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_solutions_downvotes ON solutions (downvotes)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_solutions_score")
@@ -0,0 +1,53 @@
+"""Add gen_uuid_v7() and use it for API key id defaults.
+
+Revision ID: 7a3f1c9e2b56
+Revises: 3d9e5b7a1c42
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.schema_cache import get_inspector
+
+
+revision: str = "7a3f1c9e2b56"
+down_revision: Union[str, Sequence[str], None] = "3d9e5b7a1c42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+KEY_TABLES = ("api_keys", "sub_api_keys")
+
+
+def upgrade() -> None:
+    # 48-bit unix ms timestamp followed by random bits, with version 7 / variant 10xx set.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION gen_uuid_v7() RETURNS uuid AS $$
+        DECLARE
+            value bytea;
+        BEGIN
+            value := substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                     || substring(uuid_send(gen_random_uuid()) FROM 1 FOR 10);
+            value := set_byte(value, 6, (b'0111' || get_byte(value, 6)::bit(4))::bit(8)::int);
+            value := set_byte(value, 8, (b'10' || get_byte(value, 8)::bit(6))::bit(8)::int);
+            RETURN encode(value, 'hex')::uuid;
+        END
+        $$ LANGUAGE plpgsql VOLATILE
+        """
+    )
+
+    inspector = get_inspector(op.get_bind())
+    for table in KEY_TABLES:
+        if inspector.has_table(table):
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT replace(gen_uuid_v7()::text, '-', '')")
+
+
+def downgrade() -> None:
+    inspector = get_inspector(op.get_bind())
+    for table in KEY_TABLES:
+        if inspector.has_table(table):
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT")
+    op.execute("DROP FUNCTION IF EXISTS gen_uuid_v7()")
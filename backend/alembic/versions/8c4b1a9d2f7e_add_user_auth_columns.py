@@ -10,6 +10,8 @@ from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.schema_cache import get_inspector, reset_inspector, has_table, has_column
+
 
 revision: str = "8c4b1a9d2f7e"
 down_revision: Union[str, Sequence[str], None] = "e4a1c9b7d901"
@@ -17,52 +19,68 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
-def _has_table(inspector, table: str) -> bool:
-    return table in inspector.get_table_names()
-
-
-def _has_column(inspector, table: str, column: str) -> bool:
-    return any(col["name"] == column for col in inspector.get_columns(table))
-
-
 def upgrade() -> None:
     bind = op.get_bind()
-    inspector = sa.inspect(bind)
+    inspector = get_inspector(bind)
+    changed = False
 
-    if not _has_table(inspector, "users"):
+    if not has_table(inspector, "users"):
         return
 
-    if not _has_column(inspector, "users", "id"):
+    if not has_column(inspector, "users", "id"):
         return
 
-    for col in inspector.get_columns("users"):
-        if col["name"] == "id" and not isinstance(col["type"], postgresql.UUID):
-            op.execute("ALTER TABLE users ALTER COLUMN id TYPE uuid USING id::uuid")
-            break
-
-    if not _has_column(inspector, "users", "username"):
-        op.add_column("users", sa.Column("username", sa.String(), nullable=True))
+    # users.id is converted to uuid by 2f7d9c6a1b4e without rewriting the table.
+
+    needs_username = not has_column(inspector, "users", "username")
+    clauses = []
+    if needs_username:
+        clauses.append("ADD COLUMN username varchar")
+    if not has_column(inspector, "users", "password"):
+        clauses.append("ADD COLUMN password varchar NOT NULL DEFAULT ''")
+    if clauses:
+        op.execute("ALTER TABLE users " + ", ".join(clauses))
+        changed = True
+
+    # VALIDATE commits everything before it, so a failure after it leaves the column
+    # in place with the revision unstamped. Each step checks its own state (column
+    # nullable, constraint present, constraint validated) so a re-run finishes the job.
+    username_nullable = needs_username or any(
+        col["name"] == "username" and col["nullable"] for col in inspector.get_columns("users")
+    )
+    if username_nullable:
         op.execute("UPDATE users SET username = email WHERE username IS NULL OR username = ''")
+        validated = bind.execute(
+            sa.text(
+                "SELECT convalidated FROM pg_constraint "
+                "WHERE conrelid = 'users'::regclass AND conname = 'users_username_not_null'"
+            )
+        ).scalar()
+        # A validated CHECK lets SET NOT NULL skip its own scan under the exclusive lock.
+        if validated is None:
+            op.execute("ALTER TABLE users ADD CONSTRAINT users_username_not_null CHECK (username IS NOT NULL) NOT VALID")
+        if not validated:
+            with op.get_context().autocommit_block():
+                op.execute("ALTER TABLE users VALIDATE CONSTRAINT users_username_not_null")
         op.alter_column("users", "username", nullable=False)
+        changed = True
+    op.execute("ALTER TABLE users DROP CONSTRAINT IF EXISTS users_username_not_null")
 
-    if not _has_column(inspector, "users", "password"):
-        op.add_column(
-            "users",
-            sa.Column("password", sa.String(), nullable=False, server_default=sa.text("''")),
-        )
-        op.execute("UPDATE users SET password = '' WHERE password IS NULL")
+    if changed:
+        reset_inspector(bind)
 
 
 def downgrade() -> None:
     bind = op.get_bind()
-    inspector = sa.inspect(bind)
+    inspector = get_inspector(bind)
 
-    if _has_table(inspector, "users"):
+    if has_table(inspector, "users"):
         for col in inspector.get_columns("users"):
             if col["name"] == "id" and isinstance(col["type"], postgresql.UUID):
                 op.execute("ALTER TABLE users ALTER COLUMN id TYPE varchar USING id::text")
                 break
-        if _has_column(inspector, "users", "password"):
+        if has_column(inspector, "users", "password"):
             op.drop_column("users", "password")
-        if _has_column(inspector, "users", "username"):
+        if has_column(inspector, "users", "username"):
             op.drop_column("users", "username")
+    reset_inspector(bind)
@@ -8,6 +8,8 @@ Create Date: 2026-01-14 04:10:00
 from alembic import op
 import sqlalchemy as sa
 
+from app.schema_cache import get_inspector, reset_inspector, has_column
+
 
 revision = "8f2c6a9e1b3d"
 down_revision = "3b8c1a2f6b2d"
@@ -15,21 +17,19 @@ branch_labels = None
 depends_on = None
 
 
-def _has_column(inspector, table: str, column: str) -> bool:
-    return any(col["name"] == column for col in inspector.get_columns(table))
-
-
 def upgrade() -> None:
-    inspector = sa.inspect(op.get_bind())
-    if not _has_column(inspector, "solutions", "embedding_status"):
-        op.add_column(
-            "solutions",
-            sa.Column("embedding_status", sa.String(), nullable=False, server_default=sa.text("'pending'")),
-        )
-    if not _has_column(inspector, "solutions", "embedding_error"):
-        op.add_column("solutions", sa.Column("embedding_error", sa.Text(), nullable=True))
-    if not _has_column(inspector, "solutions", "embedding_updated_at"):
-        op.add_column("solutions", sa.Column("embedding_updated_at", sa.DateTime(timezone=True), nullable=True))
+    bind = op.get_bind()
+    inspector = get_inspector(bind)
+    clauses = []
+    if not has_column(inspector, "solutions", "embedding_status"):
+        clauses.append("ADD COLUMN embedding_status varchar NOT NULL DEFAULT 'pending'")
+    if not has_column(inspector, "solutions", "embedding_error"):
+        clauses.append("ADD COLUMN embedding_error text")
+    if not has_column(inspector, "solutions", "embedding_updated_at"):
+        clauses.append("ADD COLUMN embedding_updated_at timestamp with time zone")
+    if clauses:
+        op.execute("ALTER TABLE solutions " + ", ".join(clauses))
+        reset_inspector(bind)
 
 
 def downgrade() -> None:
@@ -0,0 +1,65 @@
+"""Store solution tags/environment as JSONB and index tags with GIN.
+
+Revision ID: 9b4e6f1a3d27
+Revises: 5c8d2e4f6a10
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.schema_cache import get_inspector, reset_inspector
+
+
+revision: str = "9b4e6f1a3d27"
+down_revision: Union[str, Sequence[str], None] = "5c8d2e4f6a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+JSON_COLUMNS = ("tags", "environment")
+
+
+def _column_types(inspector, table: str) -> dict:
+    return {col["name"]: col["type"] for col in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = get_inspector(bind)
+
+    types = _column_types(inspector, "solutions")
+    clauses = [
+        f"ALTER COLUMN {name} TYPE jsonb USING {name}::jsonb"
+        for name in JSON_COLUMNS
+        if name in types and not isinstance(types[name], postgresql.JSONB)
+    ]
+    if clauses:
+        op.execute("ALTER TABLE solutions " + ", ".join(clauses))
+        reset_inspector(bind)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_solutions_tags_gin "
+            "ON solutions USING gin (tags jsonb_path_ops)"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = get_inspector(bind)
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_solutions_tags_gin")
+
+    types = _column_types(inspector, "solutions")
+    clauses = [
+        f"ALTER COLUMN {name} TYPE json USING {name}::json"
+        for name in JSON_COLUMNS
+        if name in types and isinstance(types[name], postgresql.JSONB)
+    ]
+    if clauses:
+        op.execute("ALTER TABLE solutions " + ", ".join(clauses))
+        reset_inspector(bind)
@@ -0,0 +1,33 @@
+"""Add partial indexes for listing active API keys and sub-keys.
+
+Revision ID: a4d6f8b2c1e3
+Revises: 9b4e6f1a3d27
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "a4d6f8b2c1e3"
+down_revision: Union[str, Sequence[str], None] = "9b4e6f1a3d27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_api_keys_active "
+            "ON api_keys (user_id, created_at) WHERE revoked = false"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sub_api_keys_active "
+            "ON sub_api_keys (parent_api_key_id, created_at) WHERE revoked = false"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_sub_api_keys_active")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_api_keys_active")
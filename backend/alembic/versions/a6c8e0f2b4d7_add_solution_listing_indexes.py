@@ -0,0 +1,38 @@
+"""Indexes matching the solution list/search ordering.
+
+Revision ID: a6c8e0f2b4d7
+Revises: e8b1d3f5a7c9
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "a6c8e0f2b4d7"
+down_revision: Union[str, Sequence[str], None] = "e8b1d3f5a7c9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Listings filter on visibility (+ api_key_id for private rows) and take the newest
+    # N by created_at; these let the planner read the top N without a sort.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_solutions_vis_key_created "
+            "ON solutions (visibility, api_key_id, created_at DESC)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_solutions_team_created "
+            "ON solutions (created_at DESC) WHERE visibility = 'team'"
+        )
+        # Covered by the leading column of ix_solutions_vis_key_created.
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_solutions_visibility")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_solutions_visibility ON solutions (visibility)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_solutions_team_created")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_solutions_vis_key_created")
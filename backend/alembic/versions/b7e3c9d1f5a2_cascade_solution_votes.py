@@ -0,0 +1,46 @@
+"""Cascade solution deletes to their votes.
+
+Revision ID: b7e3c9d1f5a2
+Revises: a4d6f8b2c1e3
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b7e3c9d1f5a2"
+down_revision: Union[str, Sequence[str], None] = "a4d6f8b2c1e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FK_NAME = "fk_solution_votes_solution_id"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    exists = bind.execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = :name)"),
+        {"name": FK_NAME},
+    ).scalar()
+    if exists:
+        return
+    # Votes were never tied to solutions by a constraint, so clear any orphans first.
+    op.execute(
+        """
+        DELETE FROM solution_votes v
+        WHERE NOT EXISTS (SELECT 1 FROM solutions s WHERE s.id = v.solution_id)
+        """
+    )
+    op.execute(
+        f"ALTER TABLE solution_votes ADD CONSTRAINT {FK_NAME} "
+        "FOREIGN KEY (solution_id) REFERENCES solutions (id) ON DELETE CASCADE NOT VALID"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE solution_votes VALIDATE CONSTRAINT {FK_NAME}")
+
+
+def downgrade() -> None:
+    op.execute(f"ALTER TABLE solution_votes DROP CONSTRAINT IF EXISTS {FK_NAME}")
@@ -0,0 +1,31 @@
+"""Store sub_api_keys.created_at with a time zone, like api_keys.created_at.
+
+Revision ID: b9d1f3a5c7e2
+Revises: a6c8e0f2b4d7
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "b9d1f3a5c7e2"
+down_revision: Union[str, Sequence[str], None] = "a6c8e0f2b4d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing values were written by now() into a naive column; the bundled Postgres
+    # runs in UTC, so they are read back as UTC.
+    op.execute(
+        "ALTER TABLE sub_api_keys ALTER COLUMN created_at TYPE timestamp with time zone "
+        "USING created_at AT TIME ZONE 'UTC'"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "ALTER TABLE sub_api_keys ALTER COLUMN created_at TYPE timestamp without time zone "
+        "USING created_at AT TIME ZONE 'UTC'"
+    )
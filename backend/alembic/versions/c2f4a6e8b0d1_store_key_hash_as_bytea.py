@@ -0,0 +1,60 @@
+"""Store API key hashes as raw 32-byte digests.
+
+Revision ID: c2f4a6e8b0d1
+Revises: b7e3c9d1f5a2
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.schema_cache import reset_inspector
+
+
+revision: str = "c2f4a6e8b0d1"
+down_revision: Union[str, Sequence[str], None] = "b7e3c9d1f5a2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+KEY_TABLES = ("api_keys", "sub_api_keys")
+
+
+def _key_hash_types(bind) -> dict[str, str]:
+    rows = bind.execute(
+        sa.text(
+            """
+            SELECT table_name, data_type FROM information_schema.columns
+            WHERE table_schema = current_schema()
+              AND column_name = 'key_hash' AND table_name IN ('api_keys', 'sub_api_keys')
+            """
+        )
+    )
+    return dict(rows.all())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    types = _key_hash_types(bind)
+    for table in KEY_TABLES:
+        if types.get(table) not in (None, "bytea"):
+            op.execute(
+                f"ALTER TABLE {table} ALTER COLUMN key_hash TYPE bytea USING decode(key_hash, 'hex')"
+            )
+    reset_inspector(bind)
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_api_keys_key_hash ON api_keys (key_hash)")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_api_keys_key_hash")
+    types = _key_hash_types(bind)
+    for table in KEY_TABLES:
+        if types.get(table) == "bytea":
+            op.execute(
+                f"ALTER TABLE {table} ALTER COLUMN key_hash TYPE varchar USING encode(key_hash, 'hex')"
+            )
+    reset_inspector(bind)
@@ -8,6 +8,8 @@ Create Date: 2026-01-23 03:45:00
 from alembic import op
 import sqlalchemy as sa
 
+from app.schema_cache import get_inspector, reset_inspector, has_column
+
 
 revision = "c5f2a9d1b8e7"
 down_revision = "b1a7c2d9e4f0"
@@ -15,14 +17,12 @@ branch_labels = None
 depends_on = None
 
 
-def _has_column(inspector, table: str, column: str) -> bool:
-    return any(col["name"] == column for col in inspector.get_columns(table))
-
-
 def upgrade() -> None:
-    inspector = sa.inspect(op.get_bind())
-    if not _has_column(inspector, "solutions", "vibecoding_software"):
+    bind = op.get_bind()
+    inspector = get_inspector(bind)
+    if not has_column(inspector, "solutions", "vibecoding_software"):
         op.add_column("solutions", sa.Column("vibecoding_software", sa.String(), nullable=True))
+        reset_inspector(bind)
 
 
 def downgrade() -> None:
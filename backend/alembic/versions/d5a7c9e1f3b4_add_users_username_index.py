@@ -0,0 +1,26 @@
+"""Index users.username for login lookups.
+
+Revision ID: d5a7c9e1f3b4
+Revises: c2f4a6e8b0d1
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "d5a7c9e1f3b4"
+down_revision: Union[str, Sequence[str], None] = "c2f4a6e8b0d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # login matches username OR email; without this the username arm is a seq scan.
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_username ON users (username)")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_username")
@@ -1,48 +1,97 @@
 """Bootstrap Context8 schema with users, API keys, and solutions.
 
 Revision ID: da16b97d5c07
-Revises:
+Revises: 0e1f2a3b4c5d
 Create Date: 2025-11-25 15:09:18.022081
 """
 from typing import Sequence, Union
-import hashlib
-import secrets
+import os
 
 from alembic import op
 import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import CITEXT, JSON, UUID
+from sqlalchemy.dialects.postgresql import CITEXT, JSONB, UUID
+
+from app.schema_cache import (
+    create_indexes_concurrently,
+    get_inspector,
+    has_check,
+    has_column,
+    has_table,
+    has_unique,
+    reset_inspector,
+)
 
 # revision identifiers, used by Alembic.
 revision: str = "da16b97d5c07"
-down_revision: Union[str, Sequence[str], None] = None
+down_revision: Union[str, Sequence[str], None] = "0e1f2a3b4c5d"
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
-def _has_table(inspector, name: str) -> bool:
-    return inspector.has_table(name)
-
-
-def _has_column(inspector, table: str, column: str) -> bool:
-    return any(col["name"] == column for col in inspector.get_columns(table))
-
-
-def _has_index(inspector, table: str, index_name: str) -> bool:
-    return any(idx.get("name") == index_name for idx in inspector.get_indexes(table))
-
-def _has_check(inspector, table: str, name: str) -> bool:
-    return any(item.get("name") == name for item in inspector.get_check_constraints(table))
+BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "5000"))
+
+# Columns added to solutions after the first release; NOT NULL ones carry a fast default.
+SOLUTION_ADDED_COLUMNS = {
+    "api_key_id": "varchar",
+    "conversation_language": "varchar",
+    "programming_language": "varchar",
+    "vibecoding_software": "varchar",
+    "visibility": "varchar NOT NULL DEFAULT 'private'",
+    "upvotes": "integer NOT NULL DEFAULT 0",
+    "downvotes": "integer NOT NULL DEFAULT 0",
+    "embedding_status": "varchar NOT NULL DEFAULT 'pending'",
+    "embedding_error": "text",
+    "embedding_updated_at": "timestamp with time zone",
+}
+
+SOLUTION_CHECKS = {
+    "ck_solutions_upvotes_nonnegative": "upvotes >= 0",
+    "ck_solutions_downvotes_nonnegative": "downvotes >= 0",
+    "ck_solutions_visibility": "visibility in ('private', 'team')",
+}
+
+
+def _backfill_api_key_ids(conn) -> None:
+    """Point legacy solutions at their owner's oldest active key, one committed batch at a time."""
+    conn.execute(sa.text("DROP TABLE IF EXISTS ctx8_first_key"))
+    conn.execute(sa.text("""
+        CREATE TEMPORARY TABLE ctx8_first_key ON COMMIT PRESERVE ROWS AS
+        SELECT DISTINCT ON (user_id) user_id, id
+        FROM api_keys
+        WHERE revoked = false
+        ORDER BY user_id, created_at ASC
+    """))
+    conn.execute(sa.text("ALTER TABLE ctx8_first_key ADD PRIMARY KEY (user_id)"))
+    with op.get_context().autocommit_block():
+        while True:
+            result = conn.execute(
+                sa.text("""
+                    WITH batch AS (
+                        SELECT s.ctid AS row_id, fk.id AS api_key_id
+                        FROM solutions s
+                        JOIN ctx8_first_key fk ON fk.user_id = s.user_id
+                        WHERE s.api_key_id IS NULL
+                        LIMIT :batch_size
+                    )
+                    UPDATE solutions
+                    SET api_key_id = b.api_key_id
+                    FROM batch b
+                    WHERE solutions.ctid = b.row_id
+                """),
+                {"batch_size": BATCH_SIZE},
+            )
+            if result.rowcount < BATCH_SIZE:
+                break
+    conn.execute(sa.text("DROP TABLE ctx8_first_key"))
 
 
 def upgrade() -> None:
     """Create baseline schema if missing; safe to run on a fresh database."""
     bind = op.get_bind()
-    inspector = sa.inspect(bind)
-
-    # Extensions
-    op.execute("CREATE EXTENSION IF NOT EXISTS citext")
+    inspector = get_inspector(bind)
+    indexes = []
 
     # users
-    if not _has_table(inspector, "users"):
+    if not has_table(inspector, "users"):
         op.create_table(
             "users",
             sa.Column("id", UUID(as_uuid=True), primary_key=True),
@@ -54,42 +103,45 @@ def upgrade() -> None:
             sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
         )
     else:
-        if not _has_column(inspector, "users", "username"):
+        if not has_column(inspector, "users", "username"):
             op.add_column("users", sa.Column("username", sa.String(), nullable=True))
             op.execute("UPDATE users SET username = email WHERE username IS NULL OR username = ''")
             op.execute("ALTER TABLE users ALTER COLUMN username SET NOT NULL")
-        if not _has_column(inspector, "users", "password"):
+        if not has_column(inspector, "users", "password"):
             op.add_column("users", sa.Column("password", sa.String(), nullable=False, server_default=""))
-            op.execute("UPDATE users SET password = '' WHERE password IS NULL")
-        if not _has_column(inspector, "users", "is_admin"):
+        if not has_column(inspector, "users", "is_admin"):
             op.add_column("users", sa.Column("is_admin", sa.Boolean(), nullable=False, server_default=sa.text("false")))
-        if not _has_column(inspector, "users", "email_verified"):
+        if not has_column(inspector, "users", "email_verified"):
             op.add_column("users", sa.Column("email_verified", sa.Boolean(), nullable=False, server_default=sa.text("false")))
-        if not _has_column(inspector, "users", "created_at"):
+        if not has_column(inspector, "users", "created_at"):
             op.add_column("users", sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False))
-        op.execute("ALTER TABLE users ALTER COLUMN email TYPE citext")
-        op.execute("ALTER TABLE users DROP CONSTRAINT IF EXISTS users_email_key")
-        op.create_unique_constraint("users_email_key", "users", ["email"])
+        # Changing the type rebuilds users_email_key with citext semantics, so only add it when missing.
+        email = next((col for col in inspector.get_columns("users") if col["name"] == "email"), None)
+        if email is not None and not isinstance(email["type"], CITEXT):
+            op.execute("ALTER TABLE users ALTER COLUMN email TYPE citext USING email::citext")
+        if not has_unique(inspector, "users", "users_email_key"):
+            op.create_unique_constraint("users_email_key", "users", ["email"])
 
     # api_keys
-    if not _has_table(inspector, "api_keys"):
-        op.create_table(
-            "api_keys",
-            sa.Column("id", sa.String(), primary_key=True),
-            sa.Column("user_id", sa.String(), nullable=False, index=True),
-            sa.Column("name", sa.String(), nullable=False),
-            sa.Column("key_hash", sa.String(), nullable=False),
-            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
-            sa.Column("revoked", sa.Boolean(), nullable=False, server_default=sa.text("false")),
-        )
+    op.create_table(
+        "api_keys",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("key_hash", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("revoked", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+        if_not_exists=True,
+    )
+    indexes.append(("ix_api_keys_user_id", "api_keys", "user_id"))
 
     # solutions
-    if not _has_table(inspector, "solutions"):
+    if not has_table(inspector, "solutions"):
         op.create_table(
             "solutions",
-            sa.Column("id", sa.String(), primary_key=True, index=True),
-            sa.Column("user_id", sa.String(), nullable=False, index=True),
-            sa.Column("api_key_id", sa.String(), nullable=False, index=True),
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("api_key_id", sa.String(), nullable=False),
             sa.Column("title", sa.Text(), nullable=False),
             sa.Column("error_message", sa.Text(), nullable=False),
             sa.Column("error_type", sa.String(), nullable=False),
@@ -97,7 +149,7 @@ def upgrade() -> None:
             sa.Column("root_cause", sa.Text(), nullable=False),
             sa.Column("solution", sa.Text(), nullable=False),
             sa.Column("code_changes", sa.Text(), nullable=True),
-            sa.Column("tags", JSON(), nullable=False),
+            sa.Column("tags", JSONB(), nullable=False),
             sa.Column("conversation_language", sa.String(), nullable=True),
             sa.Column("programming_language", sa.String(), nullable=True),
             sa.Column("vibecoding_software", sa.String(), nullable=True),
@@ -106,115 +158,86 @@ def upgrade() -> None:
             sa.Column("downvotes", sa.Integer(), nullable=False, server_default=sa.text("0")),
             sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
             sa.Column("project_path", sa.String(), nullable=True),
-            sa.Column("environment", JSON(), nullable=True),
+            sa.Column("environment", JSONB(), nullable=True),
             sa.Column("embedding_status", sa.String(), nullable=False, server_default=sa.text("'pending'")),
             sa.Column("embedding_error", sa.Text(), nullable=True),
             sa.Column("embedding_updated_at", sa.DateTime(timezone=True), nullable=True),
+            *(sa.CheckConstraint(expr, name=name) for name, expr in SOLUTION_CHECKS.items()),
         )
-        if not _has_index(inspector, "solutions", "ix_solutions_user_id"):
-            op.create_index("ix_solutions_user_id", "solutions", ["user_id"])
-        if not _has_index(inspector, "solutions", "ix_solutions_api_key_id"):
-            op.create_index("ix_solutions_api_key_id", "solutions", ["api_key_id"])
-        if not _has_index(inspector, "solutions", "ix_solutions_created_at"):
-            op.create_index("ix_solutions_created_at", "solutions", ["created_at"])
-        if not _has_index(inspector, "solutions", "ix_solutions_upvotes"):
-            op.create_index("ix_solutions_upvotes", "solutions", ["upvotes"])
-        if not _has_index(inspector, "solutions", "ix_solutions_downvotes"):
-            op.create_index("ix_solutions_downvotes", "solutions", ["downvotes"])
-        if not _has_index(inspector, "solutions", "ix_solutions_visibility"):
-            op.create_index("ix_solutions_visibility", "solutions", ["visibility"])
-        if not _has_check(inspector, "solutions", "ck_solutions_upvotes_nonnegative"):
-            op.create_check_constraint("ck_solutions_upvotes_nonnegative", "solutions", "upvotes >= 0")
-        if not _has_check(inspector, "solutions", "ck_solutions_downvotes_nonnegative"):
-            op.create_check_constraint("ck_solutions_downvotes_nonnegative", "solutions", "downvotes >= 0")
-        if not _has_check(inspector, "solutions", "ck_solutions_visibility"):
-            op.create_check_constraint("ck_solutions_visibility", "solutions", "visibility in ('private', 'team')")
+        indexes.append(("ix_solutions_user_id", "solutions", "user_id"))
+        indexes.append(("ix_solutions_api_key_id", "solutions", "api_key_id"))
+        indexes.append(("ix_solutions_created_at", "solutions", "created_at"))
+        indexes.append(("ix_solutions_visibility", "solutions", "visibility"))
     else:
-        if not _has_column(inspector, "solutions", "api_key_id"):
-            op.add_column("solutions", sa.Column("api_key_id", sa.String(), nullable=True))
-        op.execute("CREATE INDEX IF NOT EXISTS ix_solutions_api_key_id ON solutions (api_key_id)")
-        if not _has_column(inspector, "solutions", "conversation_language"):
-            op.add_column("solutions", sa.Column("conversation_language", sa.String(), nullable=True))
-        if not _has_column(inspector, "solutions", "programming_language"):
-            op.add_column("solutions", sa.Column("programming_language", sa.String(), nullable=True))
-        if not _has_column(inspector, "solutions", "vibecoding_software"):
-            op.add_column("solutions", sa.Column("vibecoding_software", sa.String(), nullable=True))
-        if not _has_column(inspector, "solutions", "visibility"):
-            op.add_column("solutions", sa.Column("visibility", sa.String(), nullable=False, server_default=sa.text("'private'")))
-            op.execute("UPDATE solutions SET visibility = 'private' WHERE visibility IS NULL")
-        if not _has_column(inspector, "solutions", "upvotes"):
-            op.add_column("solutions", sa.Column("upvotes", sa.Integer(), nullable=False, server_default=sa.text("0")))
-            op.execute("UPDATE solutions SET upvotes = 0 WHERE upvotes IS NULL")
-        if not _has_column(inspector, "solutions", "downvotes"):
-            op.add_column("solutions", sa.Column("downvotes", sa.Integer(), nullable=False, server_default=sa.text("0")))
-            op.execute("UPDATE solutions SET downvotes = 0 WHERE downvotes IS NULL")
-        if not _has_column(inspector, "solutions", "embedding_status"):
-            op.add_column("solutions", sa.Column("embedding_status", sa.String(), nullable=False, server_default=sa.text("'pending'")))
-        if not _has_column(inspector, "solutions", "embedding_error"):
-            op.add_column("solutions", sa.Column("embedding_error", sa.Text(), nullable=True))
-        if not _has_column(inspector, "solutions", "embedding_updated_at"):
-            op.add_column("solutions", sa.Column("embedding_updated_at", sa.DateTime(timezone=True), nullable=True))
-
-        if not _has_index(inspector, "solutions", "ix_solutions_upvotes"):
-            op.create_index("ix_solutions_upvotes", "solutions", ["upvotes"])
-        if not _has_index(inspector, "solutions", "ix_solutions_downvotes"):
-            op.create_index("ix_solutions_downvotes", "solutions", ["downvotes"])
-        if not _has_index(inspector, "solutions", "ix_solutions_visibility"):
-            op.create_index("ix_solutions_visibility", "solutions", ["visibility"])
-        if not _has_check(inspector, "solutions", "ck_solutions_upvotes_nonnegative"):
-            op.create_check_constraint("ck_solutions_upvotes_nonnegative", "solutions", "upvotes >= 0")
-        if not _has_check(inspector, "solutions", "ck_solutions_downvotes_nonnegative"):
-            op.create_check_constraint("ck_solutions_downvotes_nonnegative", "solutions", "downvotes >= 0")
-        if not _has_check(inspector, "solutions", "ck_solutions_visibility"):
-            op.create_check_constraint("ck_solutions_visibility", "solutions", "visibility in ('private', 'team')")
-
-        conn = op.get_bind()
-        conn.execute(sa.text("""
-            UPDATE solutions s
-            SET api_key_id = (
-                SELECT id
-                FROM api_keys k
-                WHERE k.user_id = s.user_id AND k.revoked = false
-                ORDER BY k.created_at ASC
-                LIMIT 1
+        adds = [
+            f"ADD COLUMN {name} {ddl}"
+            for name, ddl in SOLUTION_ADDED_COLUMNS.items()
+            if not has_column(inspector, "solutions", name)
+        ]
+        if adds:
+            op.execute("ALTER TABLE solutions " + ", ".join(adds))
+        indexes.append(("ix_solutions_api_key_id", "solutions", "api_key_id"))
+        indexes.append(("ix_solutions_visibility", "solutions", "visibility"))
+        # The VALIDATE and backfill steps below commit as they go, so a failure part-way
+        # leaves earlier work committed while the revision stays unstamped. Every step in
+        # this branch is guarded (IF NOT EXISTS, NOT EXISTS, IS NULL, convalidated) so
+        # re-running the revision resumes instead of failing on what is already there.
+        missing_checks = [name for name in SOLUTION_CHECKS if not has_check(inspector, "solutions", name)]
+        if missing_checks:
+            # One ALTER adds them unvalidated; validation runs under SHARE UPDATE EXCLUSIVE only.
+            op.execute(
+                "ALTER TABLE solutions "
+                + ", ".join(f"ADD CONSTRAINT {name} CHECK ({SOLUTION_CHECKS[name]}) NOT VALID" for name in missing_checks)
             )
-            WHERE s.api_key_id IS NULL
-        """))
-
-        rows = conn.execute(sa.text("""
-            SELECT DISTINCT s.user_id
-            FROM solutions s
-            LEFT JOIN api_keys k ON k.user_id = s.user_id AND k.revoked = false
-            WHERE s.api_key_id IS NULL AND k.id IS NULL
-        """)).fetchall()
-        for (user_id,) in rows:
-            raw_key = secrets.token_urlsafe(32)
-            key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
-            key_id = secrets.token_hex(8)
-            conn.execute(
-                sa.text("""
-                    INSERT INTO api_keys (id, user_id, name, key_hash, created_at, revoked)
-                    VALUES (:id, :user_id, :name, :key_hash, now(), false)
-                """),
-                {"id": key_id, "user_id": user_id, "name": "default", "key_hash": key_hash},
+        unvalidated = [
+            name
+            for (name,) in bind.execute(
+                sa.text(
+                    "SELECT conname FROM pg_constraint "
+                    "WHERE conrelid = 'solutions'::regclass AND contype = 'c' AND NOT convalidated"
+                )
             )
-
+            if name in SOLUTION_CHECKS
+        ]
+        if unvalidated:
+            with op.get_context().autocommit_block():
+                for name in unvalidated:
+                    op.execute(f"ALTER TABLE solutions VALIDATE CONSTRAINT {name}")
+
+        # Create default keys first so a single backfill pass covers every legacy row.
+        conn = op.get_bind()
+        # Temporary: serves the NOT EXISTS probe and the DISTINCT ON below as index seeks.
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS tmp_api_keys_user_created "
+            "ON api_keys (user_id, created_at) WHERE revoked = false"
+        )
+        # Generated keys are never shown to anyone, so ids and hashes can come from the server.
         conn.execute(sa.text("""
-            UPDATE solutions s
-            SET api_key_id = (
-                SELECT id
-                FROM api_keys k
-                WHERE k.user_id = s.user_id AND k.revoked = false
-                ORDER BY k.created_at ASC
-                LIMIT 1
-            )
-            WHERE s.api_key_id IS NULL
+            INSERT INTO api_keys (id, user_id, name, key_hash, created_at, revoked)
+            SELECT encode(gen_random_bytes(8), 'hex'), m.user_id, 'default',
+                   encode(sha256(gen_random_bytes(32)), 'hex'), now(), false
+            FROM (
+                SELECT DISTINCT s.user_id
+                FROM solutions s
+                WHERE s.api_key_id IS NULL
+                  AND NOT EXISTS (
+                      SELECT 1 FROM api_keys k WHERE k.user_id = s.user_id AND k.revoked = false
+                  )
+            ) m
         """))
 
-        remaining = conn.execute(sa.text("SELECT count(*) FROM solutions WHERE api_key_id IS NULL")).scalar()
-        if remaining == 0:
+        _backfill_api_key_ids(conn)
+        op.execute("DROP INDEX IF EXISTS tmp_api_keys_user_created")
+
+        remaining = conn.execute(
+            sa.text("SELECT EXISTS (SELECT 1 FROM solutions WHERE api_key_id IS NULL)")
+        ).scalar()
+        if not remaining:
             op.execute("ALTER TABLE solutions ALTER COLUMN api_key_id SET NOT NULL")
 
+    reset_inspector(bind)
+    create_indexes_concurrently(indexes)
+
 def downgrade() -> None:
     """Drop all Context8 tables (unsafe; for development rollback only)."""
     op.execute("DROP INDEX IF EXISTS ix_solutions_created_at")
@@ -226,4 +249,3 @@ def downgrade() -> None:
 
     # Users kept last to avoid FK issues when added later
     op.execute("DROP TABLE IF EXISTS users")
-    op.execute("DROP EXTENSION IF EXISTS citext")
@@ -0,0 +1,26 @@
+"""Partial index on admin users.
+
+Revision ID: e8b1d3f5a7c9
+Revises: d5a7c9e1f3b4
+Create Date: 2026-10-16
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "e8b1d3f5a7c9"
+down_revision: Union[str, Sequence[str], None] = "d5a7c9e1f3b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # admin_exists() runs on every setup-status check; this keeps it to one index leaf.
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_admin ON users (id) WHERE is_admin = true")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_admin")
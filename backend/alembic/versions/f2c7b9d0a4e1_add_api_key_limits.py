@@ -8,6 +8,8 @@ Create Date: 2026-02-04 00:00:00
 from alembic import op
 import sqlalchemy as sa
 
+from app.schema_cache import reset_inspector
+
 
 revision = "f2c7b9d0a4e1"
 down_revision = "2f7d9c6a1b4e"
@@ -15,18 +17,31 @@ branch_labels = None
 depends_on = None
 
 
-def _has_column(inspector, table: str, column: str) -> bool:
-    return any(col["name"] == column for col in inspector.get_columns(table))
-
-
 def upgrade() -> None:
-    inspector = sa.inspect(op.get_bind())
-    if not inspector.has_table("api_keys"):
+    bind = op.get_bind()
+    table_exists, has_daily_limit, has_monthly_limit = bind.execute(
+        sa.text(
+            """
+            SELECT to_regclass('api_keys') IS NOT NULL,
+                   EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_schema = current_schema()
+                             AND table_name = 'api_keys' AND column_name = 'daily_limit'),
+                   EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_schema = current_schema()
+                             AND table_name = 'api_keys' AND column_name = 'monthly_limit')
+            """
+        )
+    ).one()
+    if not table_exists:
         return
-    if not _has_column(inspector, "api_keys", "daily_limit"):
-        op.add_column("api_keys", sa.Column("daily_limit", sa.Integer(), nullable=True))
-    if not _has_column(inspector, "api_keys", "monthly_limit"):
-        op.add_column("api_keys", sa.Column("monthly_limit", sa.Integer(), nullable=True))
+    clauses = []
+    if not has_daily_limit:
+        clauses.append("ADD COLUMN daily_limit integer")
+    if not has_monthly_limit:
+        clauses.append("ADD COLUMN monthly_limit integer")
+    if clauses:
+        op.execute("ALTER TABLE api_keys " + ", ".join(clauses))
+        reset_inspector(bind)
 
 
 def downgrade() -> None:
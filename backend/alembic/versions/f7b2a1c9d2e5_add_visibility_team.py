@@ -7,7 +7,8 @@ Create Date: 2026-01-25
 from typing import Sequence, Union
 
 from alembic import op
-import sqlalchemy as sa
+
+from app.schema_cache import get_inspector, reset_inspector, has_column
 
 
 # revision identifiers, used by Alembic.
@@ -17,52 +18,38 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
-def _has_column(inspector, table: str, column: str) -> bool:
-    return any(col["name"] == column for col in inspector.get_columns(table))
-
-
 def upgrade() -> None:
     bind = op.get_bind()
-    inspector = sa.inspect(bind)
+    inspector = get_inspector(bind)
 
-    if not _has_column(inspector, "solutions", "visibility"):
-        with op.batch_alter_table("solutions") as batch_op:
-            batch_op.add_column(
-                sa.Column("visibility", sa.String(), nullable=False, server_default="private")
-            )
-            batch_op.create_check_constraint(
-                "ck_solutions_visibility", "visibility in ('private','team')"
-            )
-            batch_op.create_index("ix_solutions_visibility", ["visibility"])
-
-    if _has_column(inspector, "solutions", "is_public"):
+    if not has_column(inspector, "solutions", "visibility"):
         op.execute(
-            """
-            UPDATE solutions
-            SET visibility = CASE
-                WHEN is_public THEN 'team'
-                ELSE 'private'
-            END
-            """
+            "ALTER TABLE solutions "
+            "ADD COLUMN visibility varchar NOT NULL DEFAULT 'private', "
+            "ADD CONSTRAINT ck_solutions_visibility CHECK (visibility in ('private','team'))"
         )
-        with op.batch_alter_table("solutions") as batch_op:
-            batch_op.drop_column("is_public")
 
-    if _has_column(inspector, "api_keys", "is_public"):
-        with op.batch_alter_table("api_keys") as batch_op:
-            batch_op.drop_column("is_public")
+    if has_column(inspector, "solutions", "is_public"):
+        # New rows already default to 'private'; only public ones need rewriting.
+        op.execute("UPDATE solutions SET visibility = 'team' WHERE is_public AND visibility <> 'team'")
+        op.execute("ALTER TABLE solutions DROP COLUMN is_public")
+
+    if has_column(inspector, "api_keys", "is_public"):
+        op.execute("ALTER TABLE api_keys DROP COLUMN is_public")
+    reset_inspector(bind)
+
+    # Built after the is_public backfill so the UPDATE does not maintain it row by row.
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_solutions_visibility ON solutions (visibility)")
 
 
 def downgrade() -> None:
     bind = op.get_bind()
-    inspector = sa.inspect(bind)
+    inspector = get_inspector(bind)
 
-    if not _has_column(inspector, "solutions", "is_public"):
-        with op.batch_alter_table("solutions") as batch_op:
-            batch_op.add_column(
-                sa.Column("is_public", sa.Boolean(), nullable=False, server_default=sa.text("false"))
-            )
-    if _has_column(inspector, "solutions", "visibility"):
+    if not has_column(inspector, "solutions", "is_public"):
+        op.execute("ALTER TABLE solutions ADD COLUMN is_public boolean NOT NULL DEFAULT false")
+    if has_column(inspector, "solutions", "visibility"):
         op.execute(
             """
             UPDATE solutions
@@ -72,13 +59,13 @@ def downgrade() -> None:
             END
             """
         )
-        with op.batch_alter_table("solutions") as batch_op:
-            batch_op.drop_index("ix_solutions_visibility")
-            batch_op.drop_constraint("ck_solutions_visibility", type_="check")
-            batch_op.drop_column("visibility")
+        op.execute("DROP INDEX IF EXISTS ix_solutions_visibility")
+        op.execute(
+            "ALTER TABLE solutions "
+            "DROP CONSTRAINT IF EXISTS ck_solutions_visibility, "
+            "DROP COLUMN visibility"
+        )
 
-    if not _has_column(inspector, "api_keys", "is_public"):
-        with op.batch_alter_table("api_keys") as batch_op:
-            batch_op.add_column(
-                sa.Column("is_public", sa.Boolean(), nullable=False, server_default=sa.text("false"))
-            )
+    if not has_column(inspector, "api_keys", "is_public"):
+        op.execute("ALTER TABLE api_keys ADD COLUMN is_public boolean NOT NULL DEFAULT false")
+    reset_inspector(bind)
@@ -8,6 +8,8 @@ Create Date: 2026-02-04 00:00:00
 from alembic import op
 import sqlalchemy as sa
 
+from app.schema_cache import reset_inspector
+
 
 revision = "g1b2c3d4e5f6"
 down_revision = "f2c7b9d0a4e1"
@@ -15,14 +17,7 @@ branch_labels = None
 depends_on = None
 
 
-def _has_table(inspector, table: str) -> bool:
-    return inspector.has_table(table)
-
-
 def upgrade() -> None:
-    inspector = sa.inspect(op.get_bind())
-    if _has_table(inspector, "sub_api_keys"):
-        return
     op.create_table(
         "sub_api_keys",
         sa.Column("id", sa.String(), primary_key=True),
@@ -36,10 +31,12 @@ def upgrade() -> None:
         sa.Column("can_write", sa.Boolean(), server_default=sa.text("true"), nullable=False),
         sa.Column("daily_limit", sa.Integer(), nullable=True),
         sa.Column("monthly_limit", sa.Integer(), nullable=True),
+        if_not_exists=True,
     )
-    op.create_index("ix_sub_api_keys_parent", "sub_api_keys", ["parent_api_key_id"])
-    op.create_index("ix_sub_api_keys_user", "sub_api_keys", ["user_id"])
-    op.create_index("ix_sub_api_keys_key_hash", "sub_api_keys", ["key_hash"])
+    op.create_index("ix_sub_api_keys_parent", "sub_api_keys", ["parent_api_key_id"], if_not_exists=True)
+    op.create_index("ix_sub_api_keys_user", "sub_api_keys", ["user_id"], if_not_exists=True)
+    op.create_index("ix_sub_api_keys_key_hash", "sub_api_keys", ["key_hash"], if_not_exists=True)
+    reset_inspector(op.get_bind())
 
 
 def downgrade() -> None:
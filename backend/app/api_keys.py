@@ -1,17 +1,23 @@
 import secrets
 import hashlib
+import logging
+import os
+import time
 import uuid
 from dataclasses import dataclass
-from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, and_, any_, bindparam, union_all
 from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi.responses import ORJSONResponse
 from .database import get_session, Base
-from sqlalchemy import Column, String, DateTime, Boolean, Integer
-from .auth import require_admin_user
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, LargeBinary, Index, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.sql import func
+from .auth import require_admin_user, require_verified_admin_user
 from .users import User
-from .models import Solution, SolutionVote
-from .es import delete_solution_es, index_solution_es
+from .models import Solution
+from .crud import generate_id
+from .es import bulk_delete_solutions_es, bulk_index_solutions_es
 from .es_docs import solution_to_es_doc
 from .schemas import (
     ApiKeyCreate,
@@ -26,36 +32,59 @@ from .schemas import (
 class ApiKey(Base):
     __tablename__ = "api_keys"
     id = Column(String, primary_key=True)
-    user_id = Column(String, nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=False), nullable=False, index=True)
     name = Column(String, nullable=False)
-    key_hash = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    key_hash = Column(LargeBinary, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     revoked = Column(Boolean, default=False)
     daily_limit = Column(Integer, nullable=True)
     monthly_limit = Column(Integer, nullable=True)
     # No public visibility on keys; access is managed per-solution.
 
+    __table_args__ = (
+        Index("ix_api_keys_active", "user_id", "created_at", postgresql_where=text("revoked = false")),
+    )
+
+    # Server defaults (created_at) come back via RETURNING on insert.
+    __mapper_args__ = {"eager_defaults": True}
+
 
 class SubApiKey(Base):
     __tablename__ = "sub_api_keys"
     id = Column(String, primary_key=True)
     parent_api_key_id = Column(String, nullable=False, index=True)
-    user_id = Column(String, nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=False), nullable=False, index=True)
     name = Column(String, nullable=False)
-    key_hash = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    key_hash = Column(LargeBinary, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     revoked = Column(Boolean, default=False)
     can_read = Column(Boolean, default=True)
     can_write = Column(Boolean, default=True)
     daily_limit = Column(Integer, nullable=True)
     monthly_limit = Column(Integer, nullable=True)
 
+    __table_args__ = (
+        Index("ix_sub_api_keys_active", "parent_api_key_id", "created_at", postgresql_where=text("revoked = false")),
+    )
+
+    # Server defaults (created_at) come back via RETURNING on insert.
+    __mapper_args__ = {"eager_defaults": True}
+
 
-router = APIRouter(prefix="/apikeys", tags=["apikeys"])
+logger = logging.getLogger(__name__)
 
+router = APIRouter(prefix="/apikeys", tags=["apikeys"], default_response_class=ORJSONResponse)
 
-def hash_key(key: str) -> str:
-    return hashlib.sha256(key.encode()).hexdigest()
+CLEANUP_BATCH_SIZE = 500
+
+
+_SHA256 = hashlib.sha256()
+
+
+def hash_key(key: str) -> bytes:
+    digest = _SHA256.copy()
+    digest.update(key.encode())
+    return digest.digest()
 
 
 @dataclass
@@ -70,57 +99,68 @@ class KeyScope:
     daily_limit: int | None
     monthly_limit: int | None
 
-async def _cleanup_solutions_for_key(db: AsyncSession, key_id: str) -> None:
-    res = await db.execute(select(Solution).where(Solution.api_key_id == key_id))
-    items = res.scalars().all()
-    if not items:
-        return
 
-    es_deleted_docs: list[tuple[str, dict]] = []
-    for item in items:
-        doc = solution_to_es_doc(item)
+# Resolved keys are reused for a short while; revoke/update endpoints invalidate them.
+SCOPE_CACHE_TTL = float(os.environ.get("API_KEY_CACHE_TTL", "30"))
+SCOPE_CACHE_MAX_SIZE = 10_000
+_SCOPE_CACHE: dict[bytes, tuple[float, KeyScope]] = {}
+
+
+async def _restore_solutions_es(db: AsyncSession, solution_ids: list[str]) -> None:
+    # The DB rows are still intact whenever this runs, so rollback docs are rebuilt from them.
+    res = await db.execute(select(Solution).where(Solution.id.in_(solution_ids)))
+    await bulk_index_solutions_es([(item.id, solution_to_es_doc(item)) for item in res.scalars()])
+
+
+async def _cleanup_solutions_for_key(db: AsyncSession, key_id: str) -> None:
+    # Each batch is deleted (votes cascade), removed from ES and committed before the
+    # next one is taken, so memory and the _bulk payload stay bounded however many
+    # solutions the key owns.
+    while True:
+        batch = select(Solution.id).where(Solution.api_key_id == key_id).limit(CLEANUP_BATCH_SIZE)
+        res = await db.execute(delete(Solution).where(Solution.id.in_(batch)).returning(Solution.id))
+        solution_ids = list(res.scalars())
+        if not solution_ids:
+            return
+        await _cleanup_solution_batch(db, solution_ids)
+        if len(solution_ids) < CLEANUP_BATCH_SIZE:
+            return
+
+
+async def _cleanup_solution_batch(db: AsyncSession, solution_ids: list[str]) -> None:
+    # The batch's rows are deleted but not yet committed; a rollback brings them back.
+    try:
+        await bulk_delete_solutions_es(solution_ids)
+    except Exception as exc:
+        await db.rollback()
+        # Part of the batch may already be gone; re-indexing the rest is harmless.
         try:
-            await delete_solution_es(item.id)
-        except Exception as exc:
-            rollback_errors: list[str] = []
-            for rollback_id, rollback_doc in es_deleted_docs:
-                try:
-                    await index_solution_es(rollback_id, rollback_doc)
-                except Exception as rollback_exc:
-                    rollback_errors.append(f"{rollback_id}: {rollback_exc}")
-            if rollback_errors:
-                raise HTTPException(
-                    status_code=502,
-                    detail=(
-                        "Failed to delete ES docs during API key cleanup "
-                        f"({item.id}: {exc}); ES rollback failed for {', '.join(rollback_errors)}"
-                    ),
-                ) from exc
+            await _restore_solutions_es(db, solution_ids)
+        except Exception as rollback_exc:
             raise HTTPException(
                 status_code=502,
-                detail=f"Failed to delete ES docs during API key cleanup ({item.id}: {exc})",
+                detail=(
+                    "Failed to delete ES docs during API key cleanup "
+                    f"({exc}); ES rollback failed ({rollback_exc})"
+                ),
             ) from exc
-        es_deleted_docs.append((item.id, doc))
+        raise HTTPException(
+            status_code=502,
+            detail=f"Failed to delete ES docs during API key cleanup ({exc})",
+        ) from exc
 
-    solution_ids = [item.id for item in items]
     try:
-        await db.execute(delete(SolutionVote).where(SolutionVote.solution_id.in_(solution_ids)))
-        await db.execute(delete(Solution).where(Solution.id.in_(solution_ids)))
         await db.commit()
     except Exception as exc:
         await db.rollback()
-        rollback_errors: list[str] = []
-        for rollback_id, rollback_doc in es_deleted_docs:
-            try:
-                await index_solution_es(rollback_id, rollback_doc)
-            except Exception as rollback_exc:
-                rollback_errors.append(f"{rollback_id}: {rollback_exc}")
-        if rollback_errors:
+        try:
+            await _restore_solutions_es(db, solution_ids)
+        except Exception as rollback_exc:
             raise HTTPException(
                 status_code=500,
                 detail=(
                     "Failed to remove DB rows during API key cleanup "
-                    f"({exc}); ES rollback failed for {', '.join(rollback_errors)}"
+                    f"({exc}); ES rollback failed ({rollback_exc})"
                 ),
             ) from exc
         raise HTTPException(
@@ -129,14 +169,17 @@ async def _cleanup_solutions_for_key(db: AsyncSession, key_id: str) -> None:
         ) from exc
 
 
+# Indexed by (write << 1) | read; write access implies read access.
+_PERMISSIONS = ((None, None), (True, False), (True, True), (True, True))
+
+
 def _normalize_permissions(can_read: bool | None, can_write: bool | None) -> tuple[bool, bool]:
     read = True if can_read is None else bool(can_read)
     write = True if can_write is None else bool(can_write)
-    if write and not read:
-        read = True
-    if not read and not write:
+    normalized = _PERMISSIONS[(write << 1) | read]
+    if normalized[0] is None:
         raise HTTPException(status_code=400, detail="At least one permission must be enabled")
-    return read, write
+    return normalized
 
 
 @router.post("")
@@ -146,8 +189,9 @@ async def create_api_key(
     daily_limit: int | None = Query(default=None, ge=0, alias="dailyLimit"),
     monthly_limit: int | None = Query(default=None, ge=0, alias="monthlyLimit"),
     db: AsyncSession = Depends(get_session),
-    admin_user: User = Depends(require_admin_user),
+    admin_user: User = Depends(require_verified_admin_user),
 ):
+    admin_id = str(admin_user.id)
     if payload:
         name = payload.name
         if payload.dailyLimit is not None:
@@ -160,10 +204,10 @@ async def create_api_key(
 
     raw_key = secrets.token_urlsafe(32)
     hashed = hash_key(raw_key)
-    key_id = secrets.token_hex(8)
+    key_id = generate_id()
     record = ApiKey(
         id=key_id,
-        user_id=str(admin_user.id),
+        user_id=admin_id,
         name=name.strip(),
         key_hash=hashed,
         daily_limit=daily_limit,
@@ -181,7 +225,8 @@ async def create_api_key(
 
 @router.get("", response_model=list[ApiKeyOut])
 async def list_api_keys(db: AsyncSession = Depends(get_session), admin_user: User = Depends(require_admin_user)):
-    res = await db.execute(select(ApiKey).where(ApiKey.user_id == str(admin_user.id), ApiKey.revoked == False))
+    admin_id = str(admin_user.id)
+    res = await db.execute(select(ApiKey).where(ApiKey.user_id == admin_id, ApiKey.revoked == False))
     items = res.scalars().all()
     return [
         {
@@ -200,21 +245,28 @@ async def update_api_key_limits(
     key_id: str,
     payload: ApiKeyLimitsUpdate,
     db: AsyncSession = Depends(get_session),
-    admin_user: User = Depends(require_admin_user),
+    admin_user: User = Depends(require_verified_admin_user),
 ):
-    res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == str(admin_user.id)))
-    item = res.scalar_one_or_none()
-    if not item:
-        raise HTTPException(status_code=404, detail="Not found")
-
+    admin_id = str(admin_user.id)
     fields = payload.model_fields_set
+    values = {}
     if "dailyLimit" in fields:
-        item.daily_limit = payload.dailyLimit
+        values["daily_limit"] = payload.dailyLimit
     if "monthlyLimit" in fields:
-        item.monthly_limit = payload.monthlyLimit
+        values["monthly_limit"] = payload.monthlyLimit
+
+    owned = (ApiKey.id == key_id, ApiKey.user_id == admin_id)
+    if values:
+        # UPDATE ... RETURNING checks ownership and writes in one round trip.
+        res = await db.execute(update(ApiKey).where(*owned).values(**values).returning(ApiKey))
+    else:
+        res = await db.execute(select(ApiKey).where(*owned))
+    item = res.scalar_one_or_none()
+    if not item:
+        raise HTTPException(status_code=404, detail="Not found")
 
     await db.commit()
-    await db.refresh(item)
+    invalidate_key_scopes(item.id)
     return {
         "id": item.id,
         "name": item.name,
@@ -229,11 +281,12 @@ async def create_sub_api_key(
     key_id: str,
     payload: SubApiKeyCreate,
     db: AsyncSession = Depends(get_session),
-    admin_user: User = Depends(require_admin_user),
+    admin_user: User = Depends(require_verified_admin_user),
 ):
+    admin_id = str(admin_user.id)
     if not payload.name or not payload.name.strip():
         raise HTTPException(status_code=400, detail="name is required")
-    parent_res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == str(admin_user.id)))
+    parent_res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == admin_id))
     parent = parent_res.scalar_one_or_none()
     if not parent or parent.revoked:
         raise HTTPException(status_code=404, detail="Parent API key not found")
@@ -241,11 +294,11 @@ async def create_sub_api_key(
     can_read, can_write = _normalize_permissions(payload.canRead, payload.canWrite)
     raw_key = secrets.token_urlsafe(32)
     hashed = hash_key(raw_key)
-    sub_id = secrets.token_hex(8)
+    sub_id = generate_id()
     record = SubApiKey(
         id=sub_id,
         parent_api_key_id=parent.id,
-        user_id=str(admin_user.id),
+        user_id=admin_id,
         name=payload.name.strip(),
         key_hash=hashed,
         can_read=can_read,
@@ -274,7 +327,8 @@ async def list_sub_api_keys(
     db: AsyncSession = Depends(get_session),
     admin_user: User = Depends(require_admin_user),
 ):
-    parent_res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == str(admin_user.id)))
+    admin_id = str(admin_user.id)
+    parent_res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == admin_id))
     parent = parent_res.scalar_one_or_none()
     if not parent:
         raise HTTPException(status_code=404, detail="Parent API key not found")
@@ -283,7 +337,7 @@ async def list_sub_api_keys(
         select(SubApiKey)
         .where(
             SubApiKey.parent_api_key_id == parent.id,
-            SubApiKey.user_id == str(admin_user.id),
+            SubApiKey.user_id == admin_id,
             SubApiKey.revoked == False,
         )
         .order_by(SubApiKey.created_at.asc())
@@ -310,21 +364,26 @@ async def update_sub_api_key(
     sub_id: str,
     payload: SubApiKeyUpdate,
     db: AsyncSession = Depends(get_session),
-    admin_user: User = Depends(require_admin_user),
+    admin_user: User = Depends(require_verified_admin_user),
 ):
-    parent_res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == str(admin_user.id)))
-    parent = parent_res.scalar_one_or_none()
-    if not parent:
-        raise HTTPException(status_code=404, detail="Parent API key not found")
-
+    admin_id = str(admin_user.id)
+    # Parent and sub-key in one SELECT; a missing sub-key comes back as None.
     res = await db.execute(
-        select(SubApiKey).where(
-            SubApiKey.id == sub_id,
-            SubApiKey.parent_api_key_id == parent.id,
-            SubApiKey.user_id == str(admin_user.id),
+        select(ApiKey.id, SubApiKey)
+        .outerjoin(
+            SubApiKey,
+            and_(
+                SubApiKey.id == sub_id,
+                SubApiKey.parent_api_key_id == ApiKey.id,
+                SubApiKey.user_id == admin_id,
+            ),
         )
+        .where(ApiKey.id == key_id, ApiKey.user_id == admin_id)
     )
-    item = res.scalar_one_or_none()
+    row = res.one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="Parent API key not found")
+    item = row[1]
     if not item:
         raise HTTPException(status_code=404, detail="Sub API key not found")
 
@@ -349,7 +408,7 @@ async def update_sub_api_key(
         item.monthly_limit = payload.monthlyLimit
 
     await db.commit()
-    await db.refresh(item)
+    invalidate_key_scopes(item.id)
     return {
         "id": item.id,
         "parentId": item.parent_api_key_id,
@@ -367,9 +426,10 @@ async def revoke_sub_api_key(
     key_id: str,
     sub_id: str,
     db: AsyncSession = Depends(get_session),
-    admin_user: User = Depends(require_admin_user),
+    admin_user: User = Depends(require_verified_admin_user),
 ):
-    parent_res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == str(admin_user.id)))
+    admin_id = str(admin_user.id)
+    parent_res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == admin_id))
     parent = parent_res.scalar_one_or_none()
     if not parent:
         raise HTTPException(status_code=404, detail="Parent API key not found")
@@ -378,7 +438,7 @@ async def revoke_sub_api_key(
         select(SubApiKey).where(
             SubApiKey.id == sub_id,
             SubApiKey.parent_api_key_id == parent.id,
-            SubApiKey.user_id == str(admin_user.id),
+            SubApiKey.user_id == admin_id,
         )
     )
     item = res.scalar_one_or_none()
@@ -386,18 +446,21 @@ async def revoke_sub_api_key(
         raise HTTPException(status_code=404, detail="Sub API key not found")
     item.revoked = True
     await db.commit()
+    invalidate_key_scopes(item.id)
     return {"status": "revoked"}
 
 
 @router.delete("/{key_id}")
-async def revoke_api_key(key_id: str, db: AsyncSession = Depends(get_session), admin_user: User = Depends(require_admin_user)):
-    res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == str(admin_user.id)))
+async def revoke_api_key(key_id: str, db: AsyncSession = Depends(get_session), admin_user: User = Depends(require_verified_admin_user)):
+    admin_id = str(admin_user.id)
+    res = await db.execute(select(ApiKey).where(ApiKey.id == key_id, ApiKey.user_id == admin_id))
     item = res.scalar_one_or_none()
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
     await _cleanup_solutions_for_key(db, key_id)
     item.revoked = True
     await db.commit()
+    invalidate_key_scopes(item.id)
     return {"status": "revoked"}
 
 
@@ -424,83 +487,156 @@ async def list_active_sub_api_keys(db: AsyncSession, parent_ids: list[str]) -> l
     return res.scalars().all()
 
 
-async def resolve_api_keys(db: AsyncSession, raw_keys: list[str]) -> list[KeyScope]:
-    if not raw_keys:
-        return []
-
-    hashes = [hash_key(key) for key in raw_keys]
-    api_res = await db.execute(select(ApiKey).where(ApiKey.key_hash.in_(hashes)))
-    api_items = [item for item in api_res.scalars().all() if not item.revoked]
-    api_by_hash = {item.key_hash: item for item in api_items}
-
-    sub_res = await db.execute(
-        select(SubApiKey, ApiKey)
-        .where(
-            SubApiKey.key_hash.in_(hashes),
+def _active_key_query(hashes: list[bytes]):
+    # Parent keys and sub-keys in one round trip: each row is an active key that
+    # matched directly, or the active parent of a matching sub-key. The candidate
+    # parent ids come from a UNION ALL of two key_hash index lookups, so the outer
+    # join only touches those rows instead of every active key. The hashes are bound
+    # as one array so the SQL text (and its prepared statement) does not vary with
+    # the number of keys.
+    hash_array = any_(bindparam("hashes", hashes, type_=ARRAY(LargeBinary)))
+    parent_ids = union_all(
+        select(ApiKey.id).where(ApiKey.key_hash == hash_array),
+        select(SubApiKey.parent_api_key_id).where(
+            SubApiKey.key_hash == hash_array,
             SubApiKey.revoked == False,
-            SubApiKey.parent_api_key_id == ApiKey.id,
-            ApiKey.revoked == False,
+        ),
+    )
+    return (
+        select(ApiKey, SubApiKey)
+        .outerjoin(
+            SubApiKey,
+            and_(
+                SubApiKey.parent_api_key_id == ApiKey.id,
+                SubApiKey.key_hash == hash_array,
+                SubApiKey.revoked == False,
+            ),
         )
+        .where(ApiKey.id.in_(parent_ids), ApiKey.revoked == False)
     )
-    sub_by_hash: dict[str, SubApiKey] = {}
-    for sub_item, parent in sub_res.all():
-        sub_by_hash[sub_item.key_hash] = sub_item
-
-    scopes: list[KeyScope] = []
-    for raw_key, key_hash in zip(raw_keys, hashes):
-        if key_hash in sub_by_hash and key_hash in api_by_hash:
-            print("[auth] key hash collision between api and sub keys")
+
+
+async def warm_api_key_queries(db: AsyncSession) -> None:
+    # Fills SQLAlchemy's compiled cache (and one connection's asyncpg statement
+    # cache) with the per-request auth queries so the first request skips compiling.
+    await db.execute(_active_key_query([b""]))
+    await db.execute(select(User.id).where(User.id.in_([uuid.UUID(int=0)])))
+    await db.execute(select(ApiKey).where(ApiKey.id == "", ApiKey.user_id == str(uuid.UUID(int=0))))
+    await db.rollback()
+
+
+def _cached_scope(key_hash: bytes) -> KeyScope | None:
+    entry = _SCOPE_CACHE.get(key_hash)
+    if entry is None:
+        return None
+    expires_at, scope = entry
+    if expires_at < time.monotonic():
+        _SCOPE_CACHE.pop(key_hash, None)
+        return None
+    return scope
+
+
+def _cache_scope(key_hash: bytes, scope: KeyScope) -> None:
+    if len(_SCOPE_CACHE) >= SCOPE_CACHE_MAX_SIZE:
+        _SCOPE_CACHE.pop(next(iter(_SCOPE_CACHE)))
+    _SCOPE_CACHE[key_hash] = (time.monotonic() + SCOPE_CACHE_TTL, scope)
+
+
+def invalidate_key_scopes(key_id: str) -> None:
+    # Drops the key itself and, for a parent key, every sub-key resolved through it.
+    stale = [
+        key_hash
+        for key_hash, (_, scope) in _SCOPE_CACHE.items()
+        if scope.key_id == key_id or scope.parent_id == key_id
+    ]
+    for key_hash in stale:
+        _SCOPE_CACHE.pop(key_hash, None)
+
+
+async def _load_scopes(db: AsyncSession, hashes: list[bytes]) -> dict[bytes, KeyScope]:
+    res = await db.execute(_active_key_query(hashes))
+    api_by_hash: dict[bytes, ApiKey] = {}
+    sub_by_hash: dict[bytes, SubApiKey] = {}
+    for item, sub_item in res.all():
+        if item.key_hash in hashes:
+            api_by_hash[item.key_hash] = item
+        if sub_item is not None:
+            sub_by_hash[sub_item.key_hash] = sub_item
+
+    scopes: dict[bytes, KeyScope] = {}
+    collisions = api_by_hash.keys() & sub_by_hash.keys()
+    if collisions:
+        logger.warning("key hash collision between api and sub keys")
+    for key_hash in hashes:
+        if key_hash in collisions:
             continue
-        if key_hash in sub_by_hash:
-            sub_item = sub_by_hash[key_hash]
-            scopes.append(
-                KeyScope(
-                    key_id=sub_item.id,
-                    api_key_id=sub_item.id,
-                    user_id=str(sub_item.user_id),
-                    is_sub=True,
-                    parent_id=str(sub_item.parent_api_key_id),
-                    can_read=bool(sub_item.can_read),
-                    can_write=bool(sub_item.can_write),
-                    daily_limit=sub_item.daily_limit,
-                    monthly_limit=sub_item.monthly_limit,
-                )
+        sub_item = sub_by_hash.get(key_hash)
+        if sub_item is not None:
+            scopes[key_hash] = KeyScope(
+                key_id=sub_item.id,
+                api_key_id=sub_item.id,
+                user_id=str(sub_item.user_id),
+                is_sub=True,
+                parent_id=str(sub_item.parent_api_key_id),
+                can_read=bool(sub_item.can_read),
+                can_write=bool(sub_item.can_write),
+                daily_limit=sub_item.daily_limit,
+                monthly_limit=sub_item.monthly_limit,
             )
             continue
-        if key_hash in api_by_hash:
-            item = api_by_hash[key_hash]
-            scopes.append(
-                KeyScope(
-                    key_id=item.id,
-                    api_key_id=item.id,
-                    user_id=str(item.user_id),
-                    is_sub=False,
-                    parent_id=None,
-                    can_read=True,
-                    can_write=True,
-                    daily_limit=item.daily_limit,
-                    monthly_limit=item.monthly_limit,
-                )
+        item = api_by_hash.get(key_hash)
+        if item is not None:
+            scopes[key_hash] = KeyScope(
+                key_id=item.id,
+                api_key_id=item.id,
+                user_id=str(item.user_id),
+                is_sub=False,
+                parent_id=None,
+                can_read=True,
+                can_write=True,
+                daily_limit=item.daily_limit,
+                monthly_limit=item.monthly_limit,
             )
-            continue
-
     if not scopes:
-        print("[auth] no active keys found")
-        return []
+        return {}
 
-    user_ids = {scope.user_id for scope in scopes}
-    valid_users: set[str] = set()
-    for user_id in user_ids:
+    user_uuids: set[uuid.UUID] = set()
+    for scope in scopes.values():
         try:
-            user_uuid = uuid.UUID(str(user_id))
+            user_uuids.add(uuid.UUID(str(scope.user_id)))
         except Exception:
-            print("[auth] user_id not a valid uuid")
-            continue
-        user_res = await db.execute(select(User).where(User.id == user_uuid))
-        user = user_res.scalar_one_or_none()
-        if not user:
-            print(f"[auth] user missing for key user_id={user_id}")
-            continue
-        valid_users.add(str(user_uuid))
+            logger.warning("user_id not a valid uuid")
+    valid_users: set[str] = set()
+    if user_uuids:
+        user_res = await db.execute(select(User.id).where(User.id.in_(user_uuids)))
+        valid_users = {str(user_id) for user_id in user_res.scalars()}
+    for user_uuid in user_uuids:
+        if str(user_uuid) not in valid_users:
+            logger.warning("user missing for key user_id=%s", user_uuid)
+
+    return {key_hash: scope for key_hash, scope in scopes.items() if scope.user_id in valid_users}
+
+
+async def resolve_api_keys(db: AsyncSession, raw_keys: list[str]) -> list[KeyScope]:
+    if not raw_keys:
+        return []
 
-    return [scope for scope in scopes if scope.user_id in valid_users]
+    hashes = [hash_key(key) for key in raw_keys]
+    found: dict[bytes, KeyScope] = {}
+    missing: list[bytes] = []
+    for key_hash in hashes:
+        scope = _cached_scope(key_hash)
+        if scope is None:
+            missing.append(key_hash)
+        else:
+            found[key_hash] = scope
+    if missing:
+        loaded = await _load_scopes(db, missing)
+        for key_hash, scope in loaded.items():
+            _cache_scope(key_hash, scope)
+        found.update(loaded)
+
+    scopes = [found[key_hash] for key_hash in hashes if key_hash in found]
+    if not scopes:
+        logger.warning("no active keys found")
+    return scopes
@@ -1,14 +1,25 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
+import bcrypt
+import jwt
 from fastapi import Depends, Header, HTTPException, status
-from jose import JWTError, jwt
 from pydantic import BaseModel
-from sqlalchemy import func, or_, select
+from sqlalchemy import bindparam, exists, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
 
 from .config import JWT_ALG, JWT_SECRET
+from .crud import uuid7
 from .database import get_session
 from .users import User
 
@@ -17,7 +28,77 @@ SESSION_EXPIRY_DAYS = 7
 JWT_ISSUER = "context8.com"
 JWT_AUDIENCE = "context8-api"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so one thread per core runs hashes in parallel without
+# letting a burst of logins starve the default executor.
+_BCRYPT_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt")
+# Off by default (0): behind the bundled reverse proxy every login shares the proxy's
+# address, so a per-IP cap would throttle all users together. List the proxy in
+# LOGIN_TRUSTED_PROXIES to key the cap on the X-Forwarded-For client instead.
+LOGIN_CONCURRENCY_PER_IP = int(os.environ.get("LOGIN_CONCURRENCY_PER_IP", "0"))
+LOGIN_TRUSTED_PROXIES = {
+    item.strip() for item in (os.environ.get("LOGIN_TRUSTED_PROXIES") or "").split(",") if item.strip()
+}
+_logins_in_flight: dict[str, int] = {}
+
+# Built once so each request reuses the same statement objects (and their compiled SQL).
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+_USER_SNAPSHOT_BY_ID = select(
+    User.id, User.username, User.email, User.is_admin, User.email_verified
+).where(User.id == bindparam("user_id"))
+_USER_BY_LOGIN = select(User).where(
+    or_(User.username == bindparam("username"), User.email == bindparam("email"))
+)
+_ADMIN_BY_LOGIN = _USER_BY_LOGIN.where(User.is_admin == True)
+_ADMIN_EXISTS = exists().where(User.is_admin == True)
+# setup_admin's two preconditions (no admin yet, name/email free) in one round trip.
+_SETUP_CONFLICTS = select(
+    _ADMIN_EXISTS,
+    exists().where(or_(User.username == bindparam("username"), User.email == bindparam("email"))),
+)
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: uuid.UUID
+    username: str
+    email: str
+    is_admin: bool
+    email_verified: bool
+
+
+# Users loaded by ensure_user are reused across requests for a short while. Only
+# column snapshots are kept: an ORM instance would stay bound to the session that
+# loaded it and expire on that request's rollback. Password resets and admin setup
+# drop the affected entries.
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "30"))
+USER_CACHE_MAX_SIZE = 10_000
+_user_cache: dict[uuid.UUID, tuple[float, CachedUser]] = {}
+
+
+def _cached_user(user_uuid: uuid.UUID) -> CachedUser | None:
+    entry = _user_cache.get(user_uuid)
+    if entry is None:
+        return None
+    expires_at, user = entry
+    if expires_at < time.monotonic():
+        _user_cache.pop(user_uuid, None)
+        return None
+    return user
+
+
+def _cache_user(user: CachedUser) -> None:
+    if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+        _user_cache.pop(next(iter(_user_cache)))
+    _user_cache[user.id] = (time.monotonic() + USER_CACHE_TTL, user)
+
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    _user_cache.pop(user_id, None)
+
+
+JWT_CACHE_TTL = float(os.environ.get("JWT_CACHE_TTL", "300"))
+JWT_CACHE_MAX_SIZE = 50_000
+_jwt_cache: dict[bytes, tuple[float, dict]] = {}
 
 
 class UserResponse(BaseModel):
@@ -50,77 +131,119 @@ class AdminPasswordResetRequest(BaseModel):
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     try:
-        return pwd_context.verify(password, password_hash)
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
     except Exception:
         return False
 
 
-def sign_session_token(user_id: str | uuid.UUID, email: str, is_admin: bool = False) -> str:
+async def ahash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_BCRYPT_POOL, hash_password, password)
+
+
+async def averify_password(password: str, password_hash: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(
+        _BCRYPT_POOL, verify_password, password, password_hash
+    )
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# The header never changes and the HMAC key schedule only depends on the secret, so
+# both are prepared once; each token copies the keyed state instead of re-keying.
+_JWT_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+if JWT_ALG not in _JWT_DIGESTS:
+    raise RuntimeError(f"Unsupported JWT_ALG {JWT_ALG!r}; expected one of {', '.join(_JWT_DIGESTS)}")
+_JWT_HEADER = _b64url(json.dumps({"alg": JWT_ALG, "typ": "JWT"}, separators=(",", ":")).encode())
+_JWT_HMAC = hmac.new(JWT_SECRET.encode(), digestmod=_JWT_DIGESTS[JWT_ALG])
+
+
+def sign_session_token(
+    user_id: str | uuid.UUID, email: str, is_admin: bool = False, email_verified: bool = False
+) -> str:
     exp = datetime.now(timezone.utc) + timedelta(days=SESSION_EXPIRY_DAYS)
     payload = {
         "sub": str(user_id),
         "email": email,
-        "exp": exp,
+        "exp": int(exp.timestamp()),
         "iss": JWT_ISSUER,
         "aud": JWT_AUDIENCE,
         "is_admin": bool(is_admin),
+        "email_verified": bool(email_verified),
     }
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
+    signing_input = _JWT_HEADER + b"." + _b64url(json.dumps(payload, separators=(",", ":")).encode())
+    mac = _JWT_HMAC.copy()
+    mac.update(signing_input)
+    return (signing_input + b"." + _b64url(mac.digest())).decode()
 
 
-async def ensure_user(db: AsyncSession, user_id: str) -> User:
+async def ensure_user(db: AsyncSession, user_id: str) -> CachedUser:
     try:
         user_uuid = uuid.UUID(str(user_id))
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized") from exc
 
-    result = await db.execute(select(User).where(User.id == user_uuid))
-    user = result.scalar_one_or_none()
-    if not user:
+    user = _cached_user(user_uuid)
+    if user is not None:
+        return user
+    result = await db.execute(_USER_SNAPSHOT_BY_ID, {"user_id": user_uuid})
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    user = CachedUser(*row)
+    _cache_user(user)
     return user
 
 
 async def admin_exists(db: AsyncSession) -> bool:
-    res = await db.execute(select(func.count()).select_from(User).where(User.is_admin == True))
-    return (res.scalar() or 0) > 0
+    res = await db.execute(select(_ADMIN_EXISTS))
+    return bool(res.scalar())
 
 
 async def setup_admin(request: AdminSetupRequest, db: AsyncSession) -> SessionResponse:
-    if await admin_exists(db):
+    username = request.username.strip()
+    email = (request.email or username).strip()
+    conflicts = await db.execute(_SETUP_CONFLICTS, {"username": username, "email": email})
+    has_admin, user_exists = conflicts.one()
+    if has_admin:
         raise HTTPException(status_code=409, detail="Admin already exists")
 
-    username = request.username.strip()
     if not username:
         raise HTTPException(status_code=400, detail="Username is required")
     if len(request.password) < 8:
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters")
-
-    email = (request.email or username).strip()
-    password_hash = hash_password(request.password)
-
-    existing = await db.execute(select(User).where(or_(User.username == username, User.email == email)))
-    if existing.scalar_one_or_none():
+    if user_exists:
         raise HTTPException(status_code=409, detail="User already exists")
 
-    user = User(
-        id=uuid.uuid4(),
-        username=username,
-        email=email,
-        password=password_hash,
-        email_verified=True,
-        is_admin=True,
+    password_hash = await ahash_password(request.password)
+
+    stmt = (
+        pg_insert(User)
+        .values(
+            id=uuid7(),
+            username=username,
+            email=email,
+            password=password_hash,
+            email_verified=True,
+            is_admin=True,
+        )
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
     )
-    db.add(user)
+    user = (await db.execute(stmt)).scalar_one_or_none()
+    if user is None:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="User already exists")
     await db.commit()
-    await db.refresh(user)
+    invalidate_user(user.id)
 
-    session_token = sign_session_token(user.id, user.email, True)
+    session_token = sign_session_token(user.id, user.email, True, True)
     return SessionResponse(
         token=session_token,
         user=UserResponse(
@@ -140,31 +263,55 @@ async def reset_admin_password(payload: AdminPasswordResetRequest, db: AsyncSess
     if len(payload.newPassword) < 8:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password must be at least 8 characters")
 
-    result = await db.execute(
-        select(User).where(
-            User.is_admin == True,
-            or_(User.username == identifier, User.email == identifier),
-        )
-    )
+    result = await db.execute(_ADMIN_BY_LOGIN, {"username": identifier, "email": identifier})
     admin_user = result.scalar_one_or_none()
     if not admin_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin user not found")
 
-    admin_user.password = hash_password(payload.newPassword)
+    admin_user.password = await ahash_password(payload.newPassword)
     await db.commit()
+    invalidate_user(admin_user.id)
+
+
+def login_client_ip(peer: str | None, forwarded_for: str | None) -> str | None:
+    # X-Forwarded-For is only honoured from a trusted proxy; the right-most entry that
+    # is not itself a trusted proxy is the address that proxy actually saw.
+    if not peer or peer not in LOGIN_TRUSTED_PROXIES or not forwarded_for:
+        return peer
+    for hop in reversed([item.strip() for item in forwarded_for.split(",")]):
+        if hop and hop not in LOGIN_TRUSTED_PROXIES:
+            return hop
+    return peer
+
+
+async def _verify_login_password(password: str, password_hash: str, client_ip: str | None) -> bool:
+    if not client_ip or LOGIN_CONCURRENCY_PER_IP <= 0:
+        return await averify_password(password, password_hash)
+    # Cap concurrent bcrypt work per client so one source cannot saturate the pool.
+    if _logins_in_flight.get(client_ip, 0) >= LOGIN_CONCURRENCY_PER_IP:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many login attempts")
+    _logins_in_flight[client_ip] = _logins_in_flight.get(client_ip, 0) + 1
+    try:
+        return await averify_password(password, password_hash)
+    finally:
+        remaining = _logins_in_flight.pop(client_ip) - 1
+        if remaining:
+            _logins_in_flight[client_ip] = remaining
 
 
-async def login(request: LoginRequest, db: AsyncSession) -> SessionResponse:
+async def login(request: LoginRequest, db: AsyncSession, client_ip: str | None = None) -> SessionResponse:
     identifier = request.identifier.strip()
     if not identifier:
         raise HTTPException(status_code=400, detail="Identifier is required")
 
-    res = await db.execute(select(User).where(or_(User.username == identifier, User.email == identifier)))
+    res = await db.execute(_USER_BY_LOGIN, {"username": identifier, "email": identifier})
     user = res.scalar_one_or_none()
-    if not user or not user.password or not verify_password(request.password, user.password):
+    if not user or not user.password:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not await _verify_login_password(request.password, user.password, client_ip):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    session_token = sign_session_token(user.id, user.email, bool(user.is_admin))
+    session_token = sign_session_token(user.id, user.email, bool(user.is_admin), bool(user.email_verified))
     return SessionResponse(
         token=session_token,
         user=UserResponse(
@@ -177,20 +324,35 @@ async def login(request: LoginRequest, db: AsyncSession) -> SessionResponse:
     )
 
 
+def decode_session_token(token: str) -> dict:
+    # The same bearer token is sent for a whole session, so verified payloads are kept
+    # until they expire (or JWT_CACHE_TTL passes) and later requests skip the HMAC check.
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    entry = _jwt_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    payload = jwt.decode(
+        token,
+        JWT_SECRET,
+        algorithms=[JWT_ALG],
+        audience=JWT_AUDIENCE,
+        issuer=JWT_ISSUER,
+    )
+    if len(_jwt_cache) >= JWT_CACHE_MAX_SIZE:
+        _jwt_cache.pop(next(iter(_jwt_cache)))
+    _jwt_cache[key] = (min(now + JWT_CACHE_TTL, float(payload.get("exp", now))), payload)
+    return payload
+
+
 def verify_session_token(authorization: str | None = Header(default=None)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
     token = authorization.split(" ", 1)[1]
 
     try:
-        return jwt.decode(
-            token,
-            JWT_SECRET,
-            algorithms=[JWT_ALG],
-            audience=JWT_AUDIENCE,
-            issuer=JWT_ISSUER,
-        )
-    except JWTError as exc:
+        return decode_session_token(token)
+    except jwt.InvalidTokenError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {exc}") from exc
 
 
@@ -208,7 +370,34 @@ async def require_admin_user(
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    user = await ensure_user(db, user_id)
+    # The signed claims are trusted for read-only admin routes; tokens issued before
+    # the email_verified claim existed fall through to the database check.
+    if payload.get("is_admin") is True and payload.get("email_verified") is True:
+        try:
+            user_uuid = uuid.UUID(str(user_id))
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized") from exc
+        return User(id=user_uuid, email=payload.get("email"), email_verified=True, is_admin=True)
+    return await require_verified_admin_user(payload, db)
+
+
+# Every route that changes state reads the user row directly, bypassing both the
+# token claims and _user_cache, so a demoted or deleted admin is refused at once.
+async def require_verified_admin_user(
+    payload=Depends(verify_session_token),
+    db: AsyncSession = Depends(get_session),
+) -> User:
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    try:
+        user_uuid = uuid.UUID(str(user_id))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized") from exc
+    result = await db.execute(_USER_BY_ID, {"user_id": user_uuid})
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     return user
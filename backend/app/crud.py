@@ -1,14 +1,26 @@
+import os
+import time
 import uuid
 from typing import List
-from sqlalchemy import select, or_, and_, func, cast, Text, delete, update, true
+from sqlalchemy import select, insert, or_, and_, func, cast, Text, delete, update, true, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 from .models import Solution, SolutionVote
 from .schemas import SolutionCreate
 from .visibility import VISIBILITY_PRIVATE, VISIBILITY_TEAM
 
 
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (version 7) so new rows append to the primary key index."""
+    value = (time.time_ns() // 1_000_000 & 0xFFFFFFFFFFFF) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
 def generate_id() -> str:
-    return uuid.uuid4().hex
+    return uuid7().hex
 
 
 async def create_solution(
@@ -18,7 +30,7 @@ async def create_solution(
     user_id: str,
     visibility: str,
 ) -> Solution:
-    obj = Solution(
+    stmt = insert(Solution).values(
       id=generate_id(),
       user_id=user_id,
       api_key_id=api_key_id,
@@ -37,10 +49,9 @@ async def create_solution(
       environment=data.environment,
       embedding_status="pending",
       visibility=visibility,
-    )
-    db.add(obj)
+    ).returning(Solution)
+    obj = (await db.execute(stmt)).scalar_one()
     await db.commit()
-    await db.refresh(obj)
     return obj
 
 
@@ -106,6 +117,25 @@ def _visibility_condition(
     return or_(*access_conditions)
 
 
+async def _paginate(db: AsyncSession, conditions: list, limit: int, offset: int) -> tuple[int, List[Solution]]:
+    # count(*) OVER () returns the total alongside the page, so the filter runs once.
+    res = await db.execute(
+        select(Solution, func.count().over().label("total"))
+        .where(*conditions)
+        .order_by(Solution.created_at.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    rows = res.all()
+    if rows:
+        return rows[0].total, [row[0] for row in rows]
+    if limit and not offset:
+        return 0, []
+    # An empty page past the end (or limit=0) has no row to carry the total.
+    total_res = await db.execute(select(func.count(Solution.id)).where(*conditions))
+    return total_res.scalar() or 0, []
+
+
 async def list_solutions(
     db: AsyncSession,
     api_key_ids: list[str],
@@ -118,12 +148,7 @@ async def list_solutions(
     access_condition = _visibility_condition(visibility, api_key_ids, allow_team, allow_admin)
     if access_condition is None:
         return 0, []
-    base = select(Solution).where(access_condition)
-    total_res = await db.execute(select(func.count()).select_from(base.subquery()))
-    total = total_res.scalar() or 0
-
-    res = await db.execute(base.order_by(Solution.created_at.desc()).limit(limit).offset(offset))
-    return total, res.scalars().all()
+    return await _paginate(db, [access_condition], limit, offset)
 
 
 async def count_accessible_solutions(
@@ -136,10 +161,7 @@ async def count_accessible_solutions(
     access_condition = _visibility_condition(visibility, api_key_ids, allow_team, allow_admin)
     if access_condition is None:
         return 0
-    count_stmt = select(func.count()).select_from(
-        select(Solution.id).where(access_condition).subquery()
-    )
-    res = await db.execute(count_stmt)
+    res = await db.execute(select(func.count(Solution.id)).where(access_condition))
     return res.scalar() or 0
 
 
@@ -197,18 +219,14 @@ async def update_solution_visibility(
 ) -> Solution | None:
     if not api_key_ids and not allow_admin:
         return None
-    if allow_admin:
-        res = await db.execute(select(Solution).where(Solution.id == solution_id))
-    else:
-        res = await db.execute(
-            select(Solution).where(Solution.id == solution_id, Solution.api_key_id.in_(api_key_ids))
-        )
+    stmt = update(Solution).where(Solution.id == solution_id)
+    if not allow_admin:
+        stmt = stmt.where(Solution.api_key_id.in_(api_key_ids))
+    res = await db.execute(stmt.values(visibility=visibility).returning(Solution))
     sol = res.scalar_one_or_none()
     if not sol:
         return None
-    sol.visibility = visibility
     await db.commit()
-    await db.refresh(sol)
     return sol
 
 async def search_solutions(
@@ -225,22 +243,22 @@ async def search_solutions(
     access_condition = _visibility_condition(visibility, api_key_ids, allow_team, allow_admin)
     if access_condition is None:
         return 0, []
-    base = select(Solution).where(
-        access_condition,
-        or_(
-            Solution.title.ilike(pattern),
-            Solution.error_message.ilike(pattern),
-            Solution.context.ilike(pattern),
-            Solution.root_cause.ilike(pattern),
-            Solution.solution.ilike(pattern),
-            cast(Solution.tags, Text).ilike(pattern),
-        ),
+    return await _paginate(
+        db,
+        [
+            access_condition,
+            or_(
+                Solution.title.ilike(pattern),
+                Solution.error_message.ilike(pattern),
+                Solution.context.ilike(pattern),
+                Solution.root_cause.ilike(pattern),
+                Solution.solution.ilike(pattern),
+                cast(Solution.tags, Text).ilike(pattern),
+            ),
+        ],
+        limit,
+        offset,
     )
-    total_res = await db.execute(select(func.count()).select_from(base.subquery()))
-    total = total_res.scalar() or 0
-
-    res = await db.execute(base.order_by(Solution.created_at.desc()).limit(limit).offset(offset))
-    return total, res.scalars().all()
 
 
 async def get_solution_vote(db: AsyncSession, solution_id: str, user_id: str) -> int | None:
@@ -262,62 +280,52 @@ async def set_solution_vote(
     if str(solution.user_id) == str(user_id):
         raise ValueError("cannot vote on your own solution")
 
-    existing_res = await db.execute(
-        select(SolutionVote).where(SolutionVote.solution_id == solution.id, SolutionVote.user_id == user_id)
+    # Re-casting the same vote matches the WHERE and returns no row; otherwise xmax = 0
+    # tells a fresh insert apart from a flip of the opposite vote.
+    stmt = (
+        pg_insert(SolutionVote)
+        .values(id=generate_id(), solution_id=solution.id, user_id=user_id, value=value)
+        .on_conflict_do_update(
+            index_elements=[SolutionVote.solution_id, SolutionVote.user_id],
+            set_={"value": value, "updated_at": func.now()},
+            where=SolutionVote.value != value,
+        )
+        .returning(literal_column("xmax = 0"))
     )
-    existing = existing_res.scalar_one_or_none()
-
-    upvotes = int(solution.upvotes or 0)
-    downvotes = int(solution.downvotes or 0)
-
-    if not existing:
-        db.add(SolutionVote(id=generate_id(), solution_id=solution.id, user_id=user_id, value=value))
-        if value == 1:
-            upvotes += 1
-        else:
-            downvotes += 1
-        solution.upvotes = upvotes
-        solution.downvotes = downvotes
+    changed = (await db.execute(stmt)).first()
+    if changed is None:
         await db.commit()
         return value
 
-    if existing.value == value:
-        return existing.value
-
-    if existing.value == 1:
-        upvotes -= 1
-    else:
-        downvotes -= 1
+    inserted = changed[0]
+    up_delta = 1 if value == 1 else 0 if inserted else -1
+    down_delta = 1 if value == -1 else 0 if inserted else -1
+    await _apply_vote_delta(db, solution, up_delta, down_delta)
+    return value
 
-    existing.value = value
-    if value == 1:
-        upvotes += 1
-    else:
-        downvotes += 1
 
-    solution.upvotes = upvotes
-    solution.downvotes = downvotes
+async def _apply_vote_delta(db: AsyncSession, solution: Solution, up_delta: int, down_delta: int) -> None:
+    res = await db.execute(
+        update(Solution)
+        .where(Solution.id == solution.id)
+        .values(upvotes=Solution.upvotes + up_delta, downvotes=Solution.downvotes + down_delta)
+        .returning(Solution.upvotes, Solution.downvotes)
+        .execution_options(synchronize_session=False)
+    )
+    upvotes, downvotes = res.one()
     await db.commit()
-    return value
+    set_committed_value(solution, "upvotes", upvotes)
+    set_committed_value(solution, "downvotes", downvotes)
 
 
 async def clear_solution_vote(db: AsyncSession, solution: Solution, user_id: str) -> int | None:
-    existing_res = await db.execute(
-        select(SolutionVote).where(SolutionVote.solution_id == solution.id, SolutionVote.user_id == user_id)
+    res = await db.execute(
+        delete(SolutionVote)
+        .where(SolutionVote.solution_id == solution.id, SolutionVote.user_id == user_id)
+        .returning(SolutionVote.value)
     )
-    existing = existing_res.scalar_one_or_none()
-    if not existing:
+    removed = res.scalar_one_or_none()
+    if removed is None:
         return None
-
-    upvotes = int(solution.upvotes or 0)
-    downvotes = int(solution.downvotes or 0)
-    if existing.value == 1:
-        upvotes -= 1
-    else:
-        downvotes -= 1
-
-    await db.execute(delete(SolutionVote).where(SolutionVote.id == existing.id))
-    solution.upvotes = upvotes
-    solution.downvotes = downvotes
-    await db.commit()
+    await _apply_vote_delta(db, solution, -1 if removed == 1 else 0, -1 if removed == -1 else 0)
     return None
@@ -1,10 +1,13 @@
 from typing import Any
 import os
 import hashlib
-import random
 import httpx
+import numpy as np
 
 EMBEDDING_API_URL = os.environ.get("EMBEDDING_API_URL")
+EMBEDDING_BATCH_API_URL = os.environ.get("EMBEDDING_BATCH_API_URL") or (
+    f"{EMBEDDING_API_URL.rstrip('/')}/batch" if EMBEDDING_API_URL else None
+)
 EMBEDDING_TIMEOUT = float(os.environ.get("EMBEDDING_TIMEOUT", "10"))
 EMBEDDING_STRICT = os.environ.get("EMBEDDING_STRICT", "false").lower() in ("1", "true", "yes")
 
@@ -19,37 +22,58 @@ def _normalize_payload(data: Any) -> str:
     """Flatten incoming payload into a stable string."""
     if data is None:
         return ""
+    if isinstance(data, str):
+        return data
     if isinstance(data, dict):
         # keep deterministic ordering by sorting keys
-        parts = []
-        for key in sorted(data.keys()):
-            val = data[key]
-            if val is None:
-                continue
-            parts.append(f"{key}:{val}")
-        return " | ".join(parts)
+        return " | ".join(f"{key}:{val}" for key, val in sorted(data.items()) if val is not None)
     return str(data)
 
 
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    # Reused across calls so embedding requests keep their connection alive.
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=EMBEDDING_TIMEOUT)
+    return _client
+
+
+async def close_embedding_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 async def _embed_via_service(text: str) -> list[float]:
-    async with httpx.AsyncClient(timeout=EMBEDDING_TIMEOUT) as client:
-        resp = await client.post(EMBEDDING_API_URL, json={"text": text})
-        resp.raise_for_status()
-        payload = resp.json()
+    resp = await _get_client().post(EMBEDDING_API_URL, json={"text": text})
+    resp.raise_for_status()
+    payload = resp.json()
     vec = payload.get("embedding")
     if not isinstance(vec, list):
         raise ValueError("embedding service returned invalid payload")
     return vec
 
 
+async def _embed_via_service_many(texts: list[str]) -> list[list[float]]:
+    resp = await _get_client().post(EMBEDDING_BATCH_API_URL, json={"texts": texts})
+    resp.raise_for_status()
+    vectors = resp.json().get("embeddings")
+    if not isinstance(vectors, list) or len(vectors) != len(texts):
+        raise ValueError("embedding service returned invalid batch payload")
+    return vectors
+
+
 def _fallback_embedding(normalized: str) -> list[float]:
     dim = _embedding_dim()
     if not normalized:
         return [0.0] * dim
-    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
-    seed = int(digest[:16], 16)
-    rng = random.Random(seed)
-    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+    digest = hashlib.sha256(normalized.encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(digest[:8], "big"))
+    return rng.uniform(-1.0, 1.0, dim).tolist()
 
 
 async def embed_text(data: Any) -> list[float]:
@@ -67,3 +91,24 @@ async def embed_text(data: Any) -> list[float]:
             print(f"[embeddings] service failed, fallback to deterministic: {exc}")
 
     return _fallback_embedding(normalized)
+
+
+async def embed_texts(items: list[Any]) -> list[list[float]]:
+    """Batch form of embed_text for bulk paths: one request for all distinct texts."""
+    normalized = [_normalize_payload(item) for item in items]
+    unique = list(dict.fromkeys(text for text in normalized if text))
+    vectors: dict[str, list[float]] = {}
+
+    if unique and EMBEDDING_BATCH_API_URL:
+        try:
+            vectors = dict(zip(unique, await _embed_via_service_many(unique)))
+        except Exception as exc:
+            if EMBEDDING_STRICT:
+                raise
+            print(f"[embeddings] batch service failed, fallback to deterministic: {exc}")
+
+    zero = [0.0] * _embedding_dim()
+    for text in unique:
+        if text not in vectors:
+            vectors[text] = _fallback_embedding(text)
+    return [vectors[text] if text else list(zero) for text in normalized]
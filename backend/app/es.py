@@ -2,6 +2,8 @@ import os
 from typing import Any, Optional
 
 import httpx
+import numpy as np
+import orjson
 
 from .visibility import VISIBILITY_PRIVATE, VISIBILITY_TEAM
 
@@ -14,6 +16,10 @@ ES_PASSWORD = os.environ.get("ES_PASSWORD")
 ES_KNN_WEIGHT = float(os.environ.get("ES_KNN_WEIGHT", "0"))
 ES_BM25_WEIGHT = float(os.environ.get("ES_BM25_WEIGHT", "1"))
 EMBEDDING_DIM = int(os.environ.get("EMBEDDING_DIM", "384"))
+ES_HNSW_M = int(os.environ.get("ES_HNSW_M", "16"))
+ES_HNSW_EF_CONSTRUCTION = int(os.environ.get("ES_HNSW_EF_CONSTRUCTION", "64"))
+# "byte" stores int8 vectors (a quarter of float32 in the HNSW graph); needs a reindex to switch.
+ES_EMBEDDING_ELEMENT_TYPE = os.environ.get("ES_EMBEDDING_ELEMENT_TYPE", "float").lower()
 
 def _require_es_url() -> str:
     if not ES_URL:
@@ -50,9 +56,32 @@ def build_es_mapping(include_embedding: bool) -> dict[str, Any]:
             "dims": EMBEDDING_DIM,
             "index": True,
             "similarity": "l2_norm",
+            "index_options": {
+                "type": "hnsw",
+                "m": ES_HNSW_M,
+                "ef_construction": ES_HNSW_EF_CONSTRUCTION,
+            },
         }
+        if ES_EMBEDDING_ELEMENT_TYPE == "byte":
+            properties["embedding"]["element_type"] = "byte"
+            properties["embedding"]["similarity"] = "dot_product"
     return {"mappings": {"properties": properties}}
 
+
+def quantize_embedding(vector: list[float]) -> list[int]:
+    # Unit-normalize then scale to int8 so dot_product on the bytes tracks cosine similarity.
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    if norm == 0.0:
+        return [0] * len(vector)
+    return np.clip(np.rint(arr * (127.0 / norm)), -127, 127).astype(np.int8).tolist()
+
+
+def es_vector(vector: list[float]) -> list[float] | list[int]:
+    if ES_EMBEDDING_ELEMENT_TYPE == "byte":
+        return quantize_embedding(vector)
+    return vector
+
 def _extract_index_properties(mapping: dict[str, Any]) -> dict[str, Any]:
     if not mapping:
         return {}
@@ -74,6 +103,30 @@ def _auth() -> Optional[tuple[str, str]]:
     return None
 
 
+_client: httpx.AsyncClient | None = None
+# Request bodies are serialized with orjson (much faster on float-heavy knn/embedding payloads).
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _get_client() -> httpx.AsyncClient:
+    # Shared keep-alive pool; a client per call paid a new TCP (and TLS) handshake each time.
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=ES_TIMEOUT,
+            auth=_auth(),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30),
+        )
+    return _client
+
+
+async def close_es_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 def _build_access_filter(
     api_key_ids: list[str],
     allow_team: bool,
@@ -189,17 +242,17 @@ async def search_solutions_es(
     if vector and ES_KNN_WEIGHT > 0:
         body["knn"] = {
             "field": "embedding",
-            "query_vector": vector,
+            "query_vector": es_vector(vector),
             "k": limit,
             "num_candidates": max(limit * 4, 100),
             "filter": access_filter,
             "boost": ES_KNN_WEIGHT,
         }
 
-    async with httpx.AsyncClient(timeout=ES_TIMEOUT, auth=_auth()) as client:
-        resp = await client.post(f"{ES_URL}/{ES_INDEX}/_search", json=body)
-        resp.raise_for_status()
-        return resp.json()
+    client = _get_client()
+    resp = await client.post(f"{ES_URL}/{ES_INDEX}/_search", content=orjson.dumps(body), headers=_JSON_HEADERS)
+    resp.raise_for_status()
+    return orjson.loads(resp.content)
 
 
 async def fetch_solution_es(
@@ -246,74 +299,121 @@ async def fetch_solution_es(
         },
     }
 
-    async with httpx.AsyncClient(timeout=ES_TIMEOUT, auth=_auth()) as client:
-        resp = await client.post(f"{ES_URL}/{ES_INDEX}/_search", json=body)
-        resp.raise_for_status()
-        data = resp.json()
-        hits = data.get("hits", {}).get("hits", [])
-        if not hits:
-            return None
-        return hits[0].get("_source") or None
+    client = _get_client()
+    resp = await client.post(f"{ES_URL}/{ES_INDEX}/_search", content=orjson.dumps(body), headers=_JSON_HEADERS)
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+    hits = data.get("hits", {}).get("hits", [])
+    if not hits:
+        return None
+    return hits[0].get("_source") or None
 
 
 async def index_solution_es(doc_id: str, payload: dict[str, Any]) -> None:
     es_url = _require_es_url()
-    async with httpx.AsyncClient(timeout=ES_TIMEOUT, auth=_auth()) as client:
-        resp = await client.put(f"{es_url}/{ES_INDEX}/_doc/{doc_id}", json=payload)
-        resp.raise_for_status()
+    client = _get_client()
+    resp = await client.put(f"{es_url}/{ES_INDEX}/_doc/{doc_id}", content=orjson.dumps(payload), headers=_JSON_HEADERS)
+    resp.raise_for_status()
 
 
 async def update_solution_es(doc_id: str, payload: dict[str, Any]) -> None:
     es_url = _require_es_url()
     body = {"doc": payload, "doc_as_upsert": True}
-    async with httpx.AsyncClient(timeout=ES_TIMEOUT, auth=_auth()) as client:
-        resp = await client.post(f"{es_url}/{ES_INDEX}/_update/{doc_id}", json=body)
-        resp.raise_for_status()
+    client = _get_client()
+    resp = await client.post(f"{es_url}/{ES_INDEX}/_update/{doc_id}", content=orjson.dumps(body), headers=_JSON_HEADERS)
+    resp.raise_for_status()
 
 
 async def delete_solution_es(doc_id: str) -> None:
     es_url = _require_es_url()
-    async with httpx.AsyncClient(timeout=ES_TIMEOUT, auth=_auth()) as client:
-        resp = await client.delete(f"{es_url}/{ES_INDEX}/_doc/{doc_id}")
-        if resp.status_code in (200, 404):
-            return
-        resp.raise_for_status()
+    client = _get_client()
+    resp = await client.delete(f"{es_url}/{ES_INDEX}/_doc/{doc_id}")
+    if resp.status_code in (200, 404):
+        return
+    resp.raise_for_status()
+
+
+async def _bulk(actions: list[dict[str, Any]]) -> None:
+    es_url = _require_es_url()
+    body = b"".join(orjson.dumps(action) + b"\n" for action in actions)
+    client = _get_client()
+    resp = await client.post(
+        f"{es_url}/_bulk",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+    if not data.get("errors"):
+        return
+    failed = []
+    for item in data.get("items", []):
+        op_type, result = next(iter(item.items()))
+        status = result.get("status", 500)
+        if op_type == "delete" and status == 404:
+            continue
+        if status >= 300:
+            failed.append(f"{result.get('_id')}: {result.get('error')}")
+    if failed:
+        raise RuntimeError(f"bulk request failed for {', '.join(failed)}")
+
+
+async def bulk_delete_solutions_es(doc_ids: list[str]) -> None:
+    if not doc_ids:
+        return
+    await _bulk([{"delete": {"_index": ES_INDEX, "_id": doc_id}} for doc_id in doc_ids])
+
+
+async def bulk_index_solutions_es(docs: list[tuple[str, dict[str, Any]]]) -> None:
+    if not docs:
+        return
+    actions: list[dict[str, Any]] = []
+    for doc_id, payload in docs:
+        actions.append({"index": {"_index": ES_INDEX, "_id": doc_id}})
+        actions.append(payload)
+    await _bulk(actions)
 
 
 async def ensure_es_index() -> None:
     if not ES_URL:
         return
     include_embedding = ES_KNN_WEIGHT > 0
-    async with httpx.AsyncClient(timeout=ES_TIMEOUT, auth=_auth()) as client:
-        head = await client.head(f"{ES_URL}/{ES_INDEX}")
-        if head.status_code == 200:
-            if not include_embedding:
-                return
-            mapping_resp = await client.get(f"{ES_URL}/{ES_INDEX}/_mapping")
-            mapping_resp.raise_for_status()
-            props = _extract_index_properties(mapping_resp.json())
-            embedding_prop = props.get("embedding")
-            if embedding_prop is None:
-                desired = build_es_mapping(True)["mappings"]["properties"]["embedding"]
-                put_resp = await client.put(
-                    f"{ES_URL}/{ES_INDEX}/_mapping",
-                    json={"properties": {"embedding": desired}},
-                )
-                put_resp.raise_for_status()
-                return
-
-            if isinstance(embedding_prop, dict):
-                try:
-                    dims = int(embedding_prop.get("dims"))
-                    if dims != EMBEDDING_DIM:
-                        print(
-                            f"[es] embedding dims mismatch: index={ES_INDEX} "
-                            f"mapping_dims={dims} env_dims={EMBEDDING_DIM}"
-                        )
-                except Exception:
-                    pass
+    client = _get_client()
+    head = await client.head(f"{ES_URL}/{ES_INDEX}")
+    if head.status_code == 200:
+        if not include_embedding:
+            return
+        mapping_resp = await client.get(f"{ES_URL}/{ES_INDEX}/_mapping")
+        mapping_resp.raise_for_status()
+        props = _extract_index_properties(mapping_resp.json())
+        embedding_prop = props.get("embedding")
+        if embedding_prop is None:
+            desired = build_es_mapping(True)["mappings"]["properties"]["embedding"]
+            put_resp = await client.put(
+                f"{ES_URL}/{ES_INDEX}/_mapping",
+                json={"properties": {"embedding": desired}},
+            )
+            put_resp.raise_for_status()
             return
-        if head.status_code != 404:
-            head.raise_for_status()
-        resp = await client.put(f"{ES_URL}/{ES_INDEX}", json=build_es_mapping(include_embedding))
-        resp.raise_for_status()
+
+        if isinstance(embedding_prop, dict):
+            try:
+                dims = int(embedding_prop.get("dims"))
+                if dims != EMBEDDING_DIM:
+                    print(
+                        f"[es] embedding dims mismatch: index={ES_INDEX} "
+                        f"mapping_dims={dims} env_dims={EMBEDDING_DIM}"
+                    )
+            except Exception:
+                pass
+            element_type = embedding_prop.get("element_type", "float")
+            if element_type != ES_EMBEDDING_ELEMENT_TYPE:
+                print(
+                    f"[es] embedding element_type mismatch: index={ES_INDEX} "
+                    f"mapping={element_type} env={ES_EMBEDDING_ELEMENT_TYPE}; reindex to switch"
+                )
+        return
+    if head.status_code != 404:
+        head.raise_for_status()
+    resp = await client.put(f"{ES_URL}/{ES_INDEX}", json=build_es_mapping(include_embedding))
+    resp.raise_for_status()
@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Any
 
 
-def solution_to_es_doc(solution: Any, embedding: list[float] | None = None) -> dict[str, Any]:
+def solution_to_es_doc(solution: Any, embedding: list[float] | list[int] | None = None) -> dict[str, Any]:
     doc: dict[str, Any] = {
         "id": solution.id,
         "user_id": solution.user_id,
@@ -1,18 +1,21 @@
 import asyncio
 import hashlib
 import json
+import logging
 import os
+import queue
 import secrets
 import time
 import uuid
 from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 from urllib.parse import urlparse, urlunparse
-from fastapi import FastAPI, Depends, HTTPException, Header, status
+from fastapi import FastAPI, Depends, HTTPException, Header, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, delete, text
 import httpx
-from .database import get_session
+from .database import get_session, AsyncSessionLocal
 from .models import Solution, SolutionVote
 from .schemas import (
   SolutionCreate,
@@ -44,6 +47,8 @@ from .es import (
   update_solution_es,
   delete_solution_es,
   ensure_es_index,
+  close_es_client,
+  es_vector,
   ES_URL,
   ES_INDEX,
   ES_TIMEOUT,
@@ -51,20 +56,20 @@ from .es import (
   ES_BM25_WEIGHT,
   EMBEDDING_DIM,
 )
-from .embeddings import embed_text, EMBEDDING_API_URL, EMBEDDING_TIMEOUT, EMBEDDING_STRICT
+from .embeddings import embed_text, close_embedding_client, EMBEDDING_API_URL, EMBEDDING_TIMEOUT, EMBEDDING_STRICT
 from .api_keys import (
   router as apikey_router,
   resolve_api_keys,
   list_active_api_keys,
   list_active_sub_api_keys,
+  warm_api_key_queries,
   KeyScope,
 )
-from jose import jwt
-from .config import JWT_SECRET, JWT_ALG
 from .visibility import VISIBILITY_PRIVATE, normalize_visibility
 from .remote import (
   resolve_remote_config,
   remote_search,
+  close_remote_client,
   REMOTE_CONTEXT8_BASE,
   REMOTE_CONTEXT8_API_KEY,
   REMOTE_CONTEXT8_ALLOW_OVERRIDE,
@@ -79,9 +84,11 @@ from .auth import (
     LoginRequest,
     AdminPasswordResetRequest,
     ensure_user,
+    decode_session_token,
     admin_exists,
     setup_admin,
     login,
+    login_client_ip,
     reset_admin_password,
 )
 from fastapi import APIRouter
@@ -326,13 +333,7 @@ async def require_solution_read_scope(
   if authorization and authorization.startswith("Bearer "):
     token = authorization.split(" ", 1)[1]
     try:
-      data = jwt.decode(
-        token,
-        JWT_SECRET,
-        algorithms=[JWT_ALG],
-        audience="context8-api",
-        issuer="context8.com",
-      )
+      data = decode_session_token(token)
       jwt_user_id = data.get("sub")
     except Exception:
       raw_keys.append(token)
@@ -420,13 +421,7 @@ async def require_solution_write_scope(
   if authorization and authorization.startswith("Bearer "):
     token = authorization.split(" ", 1)[1]
     try:
-      data = jwt.decode(
-        token,
-        JWT_SECRET,
-        algorithms=[JWT_ALG],
-        audience="context8-api",
-        issuer="context8.com",
-      )
+      data = decode_session_token(token)
       jwt_user_id = data.get("sub")
     except Exception:
       key_scopes = await resolve_api_keys(db, [token])
@@ -497,9 +492,14 @@ async def setup_admin_account(
 @auth_router.post("/login", response_model=SessionResponse)
 async def login_account(
   payload: LoginRequest,
+  request: Request,
   db: AsyncSession = Depends(get_session),
 ):
-  return await login(payload, db)
+  client_ip = login_client_ip(
+    request.client.host if request.client else None,
+    request.headers.get("x-forwarded-for"),
+  )
+  return await login(payload, db, client_ip)
 
 
 @auth_router.post("/admin/reset-password")
@@ -649,9 +649,10 @@ async def _collect_status(db: AsyncSession) -> dict:
   else:
     components["embedding"] = {"status": "disabled", "detail": "ES_KNN_WEIGHT <= 0"}
 
+  now = time.time()
   return {
-    "updatedAt": datetime.now(timezone.utc).isoformat(),
-    "uptimeSec": max(0, int(time.time() - APP_STARTED_AT)),
+    "updatedAt": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+    "uptimeSec": max(0, int(now - APP_STARTED_AT)),
     "version": app.version,
     "environment": os.environ.get("ENVIRONMENT", "docker"),
     "status": overall,
@@ -725,6 +726,50 @@ async def on_startup():
       await asyncio.sleep(ES_STARTUP_RETRY_DELAY)
 
 
+_log_listener: QueueListener | None = None
+
+
+@app.on_event("startup")
+async def configure_logging():
+  # Auth warnings can arrive in bursts; a listener thread does the stderr writes so the
+  # event loop only enqueues records. An explicit logging config (e.g. uvicorn
+  # --log-config) that already sets root handlers is left alone.
+  global _log_listener
+  root = logging.getLogger()
+  if root.handlers or _log_listener is not None:
+    return
+  log_queue: queue.SimpleQueue = queue.SimpleQueue()
+  handler = logging.StreamHandler()
+  handler.setFormatter(logging.Formatter("[%(name)s] %(message)s"))
+  root.addHandler(QueueHandler(log_queue))
+  _log_listener = QueueListener(log_queue, handler)
+  _log_listener.start()
+
+
+@app.on_event("shutdown")
+async def stop_logging():
+  global _log_listener
+  if _log_listener is not None:
+    _log_listener.stop()
+    _log_listener = None
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+  await close_remote_client()
+  await close_es_client()
+  await close_embedding_client()
+
+
+@app.on_event("startup")
+async def warm_queries():
+  try:
+    async with AsyncSessionLocal() as db:
+      await warm_api_key_queries(db)
+  except Exception as exc:
+    print(f"[db] query warm-up skipped: {exc}")
+
+
 @app.post("/solutions", response_model=SolutionOut)
 async def save_solution(
   payload: SolutionCreate,
@@ -779,7 +824,7 @@ async def save_solution(
 
   es_start = time.perf_counter()
   try:
-    doc = solution_to_es_doc(sol, embedding)
+    doc = solution_to_es_doc(sol, es_vector(embedding) if embedding is not None else None)
     await index_solution_es(sol.id, doc)
   except Exception as exc:
     # Elasticsearch is the only search source in docker-light; avoid persisting unsearchable rows.
@@ -1139,7 +1184,6 @@ async def set_solution_visibility(
   sol.visibility = visibility
   try:
     await db.commit()
-    await db.refresh(sol)
   except Exception as exc:
     await db.rollback()
     try:
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Text, DateTime, JSON, Integer, CheckConstraint, Index, text
+from sqlalchemy import Column, String, Text, DateTime, Integer, CheckConstraint, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.sql import func
 from .database import Base
 from .visibility import VISIBILITY_PRIVATE
@@ -7,8 +8,8 @@ from .visibility import VISIBILITY_PRIVATE
 class Solution(Base):
     __tablename__ = "solutions"
 
-    id = Column(String, primary_key=True, index=True)
-    user_id = Column(String, nullable=False, index=True)
+    id = Column(String, primary_key=True)
+    user_id = Column(UUID(as_uuid=False), nullable=False, index=True)
     api_key_id = Column(String, nullable=False, index=True)
     title = Column(Text, nullable=False)
     error_message = Column(Text, nullable=False)
@@ -17,7 +18,7 @@ class Solution(Base):
     root_cause = Column(Text, nullable=False)
     solution = Column(Text, nullable=False)
     code_changes = Column(Text, nullable=True)
-    tags = Column(JSON, nullable=False)
+    tags = Column(JSONB, nullable=False)
     conversation_language = Column(String, nullable=True)
     programming_language = Column(String, nullable=True)
     vibecoding_software = Column(String, nullable=True)
@@ -26,7 +27,7 @@ class Solution(Base):
     downvotes = Column(Integer, nullable=False, server_default=text("0"))
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     project_path = Column(String, nullable=True)
-    environment = Column(JSON, nullable=True)
+    environment = Column(JSONB, nullable=True)
     embedding_status = Column(String, nullable=False, server_default=text("'pending'"))
     embedding_error = Column(Text, nullable=True)
     embedding_updated_at = Column(DateTime(timezone=True), nullable=True)
@@ -35,9 +36,10 @@ class Solution(Base):
         CheckConstraint("upvotes >= 0", name="ck_solutions_upvotes_nonnegative"),
         CheckConstraint("downvotes >= 0", name="ck_solutions_downvotes_nonnegative"),
         CheckConstraint("visibility in ('private', 'team')", name="ck_solutions_visibility"),
-        Index("ix_solutions_upvotes", "upvotes"),
-        Index("ix_solutions_downvotes", "downvotes"),
-        Index("ix_solutions_visibility", "visibility"),
+        Index("ix_solutions_score", text("(upvotes - downvotes) DESC"), text("created_at DESC")),
+        Index("ix_solutions_vis_key_created", "visibility", "api_key_id", text("created_at DESC")),
+        Index("ix_solutions_team_created", text("created_at DESC"), postgresql_where=text("visibility = 'team'")),
+        Index("ix_solutions_tags_gin", "tags", postgresql_using="gin", postgresql_ops={"tags": "jsonb_path_ops"}),
     )
 
 
@@ -45,8 +47,8 @@ class SolutionVote(Base):
     __tablename__ = "solution_votes"
 
     id = Column(String, primary_key=True)
-    solution_id = Column(String, nullable=False)
-    user_id = Column(String, nullable=False)
+    solution_id = Column(String, ForeignKey("solutions.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUID(as_uuid=False), nullable=False)
     value = Column(Integer, nullable=False)  # +1 / -1
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -62,13 +62,30 @@ def resolve_remote_config(override_base: str | None, override_key: str | None) -
     return base, api_key
 
 
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    # One pooled client per process so repeated remote searches reuse the TCP/TLS connection.
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=REMOTE_CONTEXT8_TIMEOUT)
+    return _client
+
+
+async def close_remote_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 async def remote_search(base: str, api_key: str, payload: dict[str, Any]) -> dict[str, Any]:
-    async with httpx.AsyncClient(timeout=REMOTE_CONTEXT8_TIMEOUT) as client:
-        resp = await client.post(
-            f"{base}/search",
-            json=payload,
-            headers={"X-API-Key": api_key, "Content-Type": "application/json"},
-        )
-        if resp.status_code >= 400:
-            raise HTTPException(status_code=502, detail=f"Remote search failed: {resp.text}")
-        return resp.json()
+    resp = await _get_client().post(
+        f"{base}/search",
+        json=payload,
+        headers={"X-API-Key": api_key, "Content-Type": "application/json"},
+    )
+    if resp.status_code >= 400:
+        raise HTTPException(status_code=502, detail=f"Remote search failed: {resp.text}")
+    return resp.json()
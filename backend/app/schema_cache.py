@@ -0,0 +1,97 @@
+"""Cached schema lookups and shared helpers for the Alembic revisions.
+
+One Inspector is kept per migration connection (in ``bind.info``) so that a single
+``alembic upgrade`` run reflects the catalog once instead of once per revision. The
+first lookup of each kind loads the whole schema in one query. Revisions call
+``reset_inspector`` after DDL so later checks see the new schema.
+"""
+import sqlalchemy as sa
+
+
+_INSPECTOR_KEY = "_ctx8_inspector"
+
+_SNAPSHOT_QUERIES = {
+    "columns": """
+        SELECT c.relname, a.attname
+        FROM pg_class c
+        LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        WHERE c.relkind IN ('r', 'p') AND c.relnamespace = current_schema()::regnamespace
+    """,
+    "checks": """
+        SELECT c.relname, con.conname
+        FROM pg_class c
+        LEFT JOIN pg_constraint con ON con.conrelid = c.oid AND con.contype = 'c'
+        WHERE c.relkind IN ('r', 'p') AND c.relnamespace = current_schema()::regnamespace
+    """,
+    "uniques": """
+        SELECT c.relname, con.conname
+        FROM pg_class c
+        LEFT JOIN pg_constraint con ON con.conrelid = c.oid AND con.contype = 'u'
+        WHERE c.relkind IN ('r', 'p') AND c.relnamespace = current_schema()::regnamespace
+    """,
+}
+
+_REFLECTORS = {
+    "columns": "get_columns",
+    "checks": "get_check_constraints",
+    "uniques": "get_unique_constraints",
+}
+
+
+def get_inspector(bind):
+    inspector = bind.info.get(_INSPECTOR_KEY)
+    if inspector is None:
+        inspector = bind.info[_INSPECTOR_KEY] = sa.inspect(bind)
+    return inspector
+
+
+def reset_inspector(bind) -> None:
+    bind.info.pop(_INSPECTOR_KEY, None)
+
+
+def _names(inspector, kind: str, table: str) -> frozenset:
+    cache = inspector.info_cache.get(f"_ctx8_{kind}")
+    if cache is None:
+        found: dict[str, set] = {}
+        for relname, name in inspector.bind.execute(sa.text(_SNAPSHOT_QUERIES[kind])):
+            names = found.setdefault(relname, set())
+            if name is not None:
+                names.add(name)
+        cache = inspector.info_cache[f"_ctx8_{kind}"] = {t: frozenset(n) for t, n in found.items()}
+    if table not in cache and inspector.has_table(table):
+        # Created after the snapshot without a reset_inspector() in between.
+        reflect = getattr(inspector, _REFLECTORS[kind])
+        cache[table] = frozenset(item["name"] for item in reflect(table))
+    return cache.get(table, frozenset())
+
+
+def has_table(inspector, table: str) -> bool:
+    return bool(_names(inspector, "columns", table))
+
+
+def has_column(inspector, table: str, column: str) -> bool:
+    return column in _names(inspector, "columns", table)
+
+
+def has_check(inspector, table: str, name: str) -> bool:
+    return name in _names(inspector, "checks", table)
+
+
+def has_unique(inspector, table: str, name: str) -> bool:
+    return name in _names(inspector, "uniques", table)
+
+
+def create_indexes_concurrently(indexes: list[tuple]) -> None:
+    """Build indexes outside the migration transaction so writes are not blocked.
+
+    Each entry is ``(name, table, columns, *flags)``; a ``"unique"`` flag builds a
+    unique index.
+    """
+    if not indexes:
+        return
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, *flags in indexes:
+            kind = "UNIQUE INDEX" if "unique" in flags else "INDEX"
+            op.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Boolean
+from sqlalchemy import Column, String, DateTime, Boolean, Index, text
 from sqlalchemy.dialects.postgresql import CITEXT, UUID
 from .database import Base
 
@@ -7,9 +7,13 @@ from .database import Base
 class User(Base):
     __tablename__ = "users"
     id = Column(UUID(as_uuid=True), primary_key=True)
-    username = Column(String, nullable=False)
+    username = Column(String, nullable=False, index=True)
     email = Column(CITEXT, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False, server_default="")
     email_verified = Column(Boolean, nullable=False, server_default='false')
     is_admin = Column(Boolean, nullable=False, server_default='false')
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_users_admin", "id", postgresql_where=text("is_admin = true")),
+    )
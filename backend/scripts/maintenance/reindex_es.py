@@ -7,8 +7,8 @@ import httpx
 from sqlalchemy import select
 
 from app.database import AsyncSessionLocal
-from app.embeddings import embed_text
-from app.es import ES_INDEX, ES_URL, build_es_mapping
+from app.embeddings import embed_texts
+from app.es import ES_INDEX, ES_URL, build_es_mapping, es_vector
 from app.models import Solution
 
 
@@ -16,8 +16,8 @@ BATCH_SIZE = int(os.environ.get("ES_REINDEX_BATCH", "200"))
 INCLUDE_EMBEDDING = float(os.environ.get("ES_KNN_WEIGHT", "0")) > 0
 
 
-async def _serialize_solution(sol: Solution, include_embedding: bool) -> dict[str, Any]:
-    doc = {
+def _serialize_solution(sol: Solution) -> dict[str, Any]:
+    return {
         "id": sol.id,
         "user_id": str(sol.user_id) if sol.user_id else None,
         "api_key_id": sol.api_key_id,
@@ -39,19 +39,19 @@ async def _serialize_solution(sol: Solution, include_embedding: bool) -> dict[st
         "upvotes": int(sol.upvotes or 0),
         "downvotes": int(sol.downvotes or 0),
     }
-    if include_embedding:
-        payload = {
-            "title": sol.title,
-            "errorMessage": sol.error_message,
-            "errorType": sol.error_type,
-            "context": sol.context,
-            "rootCause": sol.root_cause,
-            "solution": sol.solution,
-            "tags": sol.tags or [],
-            "environment": sol.environment,
-        }
-        doc["embedding"] = await embed_text(payload)
-    return doc
+
+
+def _embedding_payload(sol: Solution) -> dict[str, Any]:
+    return {
+        "title": sol.title,
+        "errorMessage": sol.error_message,
+        "errorType": sol.error_type,
+        "context": sol.context,
+        "rootCause": sol.root_cause,
+        "solution": sol.solution,
+        "tags": sol.tags or [],
+        "environment": sol.environment,
+    }
 
 
 def _bulk_payload(docs: Iterable[dict[str, Any]]) -> str:
@@ -85,7 +85,11 @@ async def _reindex() -> None:
                 rows = result.scalars().all()
                 if not rows:
                     break
-                docs = [await _serialize_solution(row, INCLUDE_EMBEDDING) for row in rows]
+                docs = [_serialize_solution(row) for row in rows]
+                if INCLUDE_EMBEDDING:
+                    embeddings = await embed_texts([_embedding_payload(row) for row in rows])
+                    for doc, embedding in zip(docs, embeddings):
+                        doc["embedding"] = es_vector(embedding)
                 payload = _bulk_payload(docs)
                 resp = await client.post(
                     f"{ES_URL}/_bulk",
@@ -0,0 +1,36 @@
+import asyncio
+import sys
+
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from app.database import engine
+from app.models import Solution
+
+
+USAGE = "usage: python scripts/maintenance/solution_indexes.py drop|create"
+
+
+def _secondary_indexes():
+    indexes = sorted(Solution.__table__.indexes, key=lambda index: index.name)
+    for index in indexes:
+        index.dialect_options["postgresql"]["concurrently"] = True
+    return indexes
+
+
+async def _run(action: str) -> None:
+    # CONCURRENTLY cannot run inside a transaction block.
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for index in _secondary_indexes():
+            if action == "create":
+                await conn.execute(CreateIndex(index, if_not_exists=True))
+            else:
+                await conn.execute(DropIndex(index, if_exists=True))
+            print(f"[indexes] {action} {index.name}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("drop", "create"):
+        raise SystemExit(USAGE)
+    asyncio.run(_run(sys.argv[1]))
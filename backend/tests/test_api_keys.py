@@ -0,0 +1,123 @@
+"""Behaviour tests for the resolved API key scope cache in app/api_keys.py."""
+import secrets
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, insert
+
+from app import api_keys
+from app.api_keys import (
+    ApiKey,
+    KeyScope,
+    SubApiKey,
+    _cache_scope,
+    _cached_scope,
+    hash_key,
+    invalidate_key_scopes,
+    resolve_api_keys,
+    revoke_sub_api_key,
+)
+from app.users import User
+
+
+@pytest.fixture(autouse=True)
+def clear_scope_cache():
+    api_keys._SCOPE_CACHE.clear()
+    yield
+    api_keys._SCOPE_CACHE.clear()
+
+
+def _scope(key_id: str, parent_id: str | None = None) -> KeyScope:
+    return KeyScope(
+        key_id=key_id,
+        api_key_id=key_id,
+        user_id=str(uuid.uuid4()),
+        is_sub=parent_id is not None,
+        parent_id=parent_id,
+        can_read=True,
+        can_write=True,
+        daily_limit=None,
+        monthly_limit=None,
+    )
+
+
+def test_invalidate_drops_key_and_its_sub_keys():
+    _cache_scope(b"parent", _scope("p1"))
+    _cache_scope(b"sub", _scope("s1", parent_id="p1"))
+    _cache_scope(b"other", _scope("p2"))
+
+    invalidate_key_scopes("p1")
+
+    assert _cached_scope(b"parent") is None
+    assert _cached_scope(b"sub") is None
+    assert _cached_scope(b"other").key_id == "p2"
+
+
+def test_invalidate_sub_key_keeps_parent():
+    _cache_scope(b"parent", _scope("p1"))
+    _cache_scope(b"sub", _scope("s1", parent_id="p1"))
+
+    invalidate_key_scopes("s1")
+
+    assert _cached_scope(b"parent").key_id == "p1"
+    assert _cached_scope(b"sub") is None
+
+
+def test_expired_scope_is_evicted(monkeypatch):
+    monkeypatch.setattr(api_keys, "SCOPE_CACHE_TTL", -1.0)
+    _cache_scope(b"parent", _scope("p1"))
+
+    assert _cached_scope(b"parent") is None
+    assert b"parent" not in api_keys._SCOPE_CACHE
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(api_keys, "SCOPE_CACHE_MAX_SIZE", 2)
+    _cache_scope(b"a", _scope("a"))
+    _cache_scope(b"b", _scope("b"))
+    _cache_scope(b"c", _scope("c"))
+
+    assert list(api_keys._SCOPE_CACHE) == [b"b", b"c"]
+
+
+@pytest.mark.asyncio
+async def test_revoked_sub_key_stops_resolving(db):
+    owner = str(uuid.uuid4())
+    parent_id = str(uuid.uuid4())
+    sub_id = str(uuid.uuid4())
+    raw_key = secrets.token_urlsafe(32)
+    # Scopes are only returned for keys whose owner still exists.
+    await db.execute(insert(User).values(id=uuid.UUID(owner), username="test", email=f"{owner}@example.com"))
+    await db.execute(
+        insert(ApiKey).values(
+            id=parent_id, user_id=owner, name="test", key_hash=hash_key(secrets.token_urlsafe(32)), revoked=False
+        )
+    )
+    await db.execute(
+        insert(SubApiKey).values(
+            id=sub_id,
+            parent_api_key_id=parent_id,
+            user_id=owner,
+            name="test-sub",
+            key_hash=hash_key(raw_key),
+            revoked=False,
+            can_read=True,
+            can_write=False,
+        )
+    )
+    await db.commit()
+    try:
+        (scope,) = await resolve_api_keys(db, [raw_key])
+        assert (scope.key_id, scope.parent_id, scope.is_sub) == (sub_id, parent_id, True)
+        assert _cached_scope(hash_key(raw_key)) is not None
+
+        await revoke_sub_api_key(parent_id, sub_id, db=db, admin_user=SimpleNamespace(id=owner))
+
+        assert _cached_scope(hash_key(raw_key)) is None
+        assert await resolve_api_keys(db, [raw_key]) == []
+    finally:
+        await db.execute(delete(SubApiKey).where(SubApiKey.id == sub_id))
+        await db.execute(delete(ApiKey).where(ApiKey.id == parent_id))
+        await db.execute(delete(User).where(User.id == uuid.UUID(owner)))
+        await db.commit()
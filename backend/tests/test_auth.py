@@ -0,0 +1,130 @@
+"""Behaviour tests for app/auth.py: hand-rolled HS256 session tokens and the user cache."""
+import time
+import uuid
+
+import jwt
+import pytest
+from sqlalchemy import delete, insert, update
+
+from app import auth
+from app.auth import (
+    JWT_AUDIENCE,
+    JWT_ISSUER,
+    SESSION_EXPIRY_DAYS,
+    decode_session_token,
+    ensure_user,
+    sign_session_token,
+)
+from app.config import JWT_ALG, JWT_SECRET
+from app.database import AsyncSessionLocal
+from app.users import User
+
+
+def _decode(token: str, **kwargs) -> dict:
+    return jwt.decode(
+        token,
+        kwargs.pop("key", JWT_SECRET),
+        algorithms=[JWT_ALG],
+        audience=kwargs.pop("audience", JWT_AUDIENCE),
+        issuer=JWT_ISSUER,
+    )
+
+
+def test_signed_token_round_trips_through_pyjwt():
+    user_id = uuid.uuid4()
+    token = sign_session_token(user_id, "dev@example.com", is_admin=True, email_verified=True)
+
+    assert jwt.get_unverified_header(token) == {"alg": JWT_ALG, "typ": "JWT"}
+    payload = _decode(token)
+    assert payload["sub"] == str(user_id)
+    assert payload["email"] == "dev@example.com"
+    assert payload["is_admin"] is True
+    assert payload["email_verified"] is True
+    assert payload["iss"] == JWT_ISSUER
+    assert payload["aud"] == JWT_AUDIENCE
+
+
+def test_signed_token_matches_pyjwt_encoding():
+    token = sign_session_token("user-1", "dev@example.com")
+    payload = _decode(token)
+    assert token == jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
+
+
+@pytest.mark.parametrize("alg", sorted(auth._JWT_DIGESTS))
+def test_signing_digest_follows_header_alg(monkeypatch, alg):
+    # Mirrors the module-level setup for each supported JWT_ALG.
+    monkeypatch.setattr(auth, "_JWT_HEADER", auth._b64url(b'{"alg":"%s","typ":"JWT"}' % alg.encode()))
+    monkeypatch.setattr(auth, "_JWT_HMAC", auth.hmac.new(JWT_SECRET.encode(), digestmod=auth._JWT_DIGESTS[alg]))
+    token = sign_session_token("user-1", "dev@example.com")
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[alg], audience=JWT_AUDIENCE, issuer=JWT_ISSUER)
+    assert payload["sub"] == "user-1"
+
+
+def test_signed_token_expiry():
+    before = int(time.time())
+    payload = _decode(sign_session_token("user-1", "dev@example.com"))
+    assert isinstance(payload["exp"], int)
+    assert before + SESSION_EXPIRY_DAYS * 86400 <= payload["exp"] <= int(time.time()) + SESSION_EXPIRY_DAYS * 86400
+
+
+def test_signed_token_defaults_to_unprivileged():
+    payload = _decode(sign_session_token("user-1", "dev@example.com"))
+    assert payload["is_admin"] is False
+    assert payload["email_verified"] is False
+
+
+def test_signed_tokens_do_not_share_mac_state():
+    first = sign_session_token("user-1", "a@example.com")
+    second = sign_session_token("user-2", "b@example.com")
+    assert _decode(first)["sub"] == "user-1"
+    assert _decode(second)["sub"] == "user-2"
+
+
+def test_signed_token_rejects_wrong_secret_and_audience():
+    token = sign_session_token("user-1", "dev@example.com")
+    with pytest.raises(jwt.InvalidSignatureError):
+        _decode(token, key="another-secret")
+    with pytest.raises(jwt.InvalidAudienceError):
+        _decode(token, audience="someone-else")
+
+
+def test_tampered_token_is_rejected():
+    header, _, signature = sign_session_token("user-1", "dev@example.com").split(".")
+    _, admin_payload, _ = sign_session_token("user-1", "dev@example.com", is_admin=True).split(".")
+    with pytest.raises(jwt.InvalidSignatureError):
+        decode_session_token(f"{header}.{admin_payload}.{signature}")
+
+
+def test_decode_session_token_accepts_signed_token():
+    token = sign_session_token("user-1", "dev@example.com", email_verified=True)
+    assert decode_session_token(token)["email_verified"] is True
+
+
+@pytest.mark.asyncio
+async def test_cached_user_survives_rollback_of_loading_session(db):
+    user_id = uuid.uuid4()
+    await db.execute(insert(User).values(id=user_id, username="test", email=f"{user_id}@example.com", is_admin=True))
+    await db.commit()
+    auth._user_cache.clear()
+    try:
+        async with AsyncSessionLocal() as first:
+            user = await ensure_user(first, str(user_id))
+            await first.rollback()
+        assert user.is_admin is True
+
+        # Served from the cache in a fresh session, after the loading session rolled back
+        # and closed; the row change is not seen until the entry expires or is dropped.
+        await db.execute(update(User).where(User.id == user_id).values(is_admin=False))
+        await db.commit()
+        async with AsyncSessionLocal() as second:
+            cached = await ensure_user(second, str(user_id))
+        assert cached is user
+        assert (cached.id, cached.username, cached.is_admin) == (user_id, "test", True)
+
+        auth.invalidate_user(user_id)
+        async with AsyncSessionLocal() as third:
+            assert (await ensure_user(third, str(user_id))).is_admin is False
+    finally:
+        auth._user_cache.clear()
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
@@ -0,0 +1,153 @@
+"""Behaviour tests for app/crud.py: uuid7 ids, pagination totals and vote counters."""
+import uuid
+
+import pytest
+from sqlalchemy import delete, insert
+
+from app.crud import (
+    _paginate,
+    clear_solution_vote,
+    generate_id,
+    get_solution_vote,
+    set_solution_vote,
+    uuid7,
+)
+from app.models import Solution
+
+
+def test_uuid7_version_and_variant():
+    for _ in range(100):
+        value = uuid7()
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+
+
+def test_uuid7_is_time_ordered():
+    ids = [uuid7() for _ in range(1000)]
+    # Only the 48-bit millisecond prefix is ordered; the rest is random within a millisecond.
+    prefixes = [value.int >> 80 for value in ids]
+    assert prefixes == sorted(prefixes)
+
+
+def test_uuid7_is_unique():
+    assert len({generate_id() for _ in range(10_000)}) == 10_000
+
+
+async def _insert_solutions(db, user_id: str, count: int) -> list[Solution]:
+    res = await db.execute(
+        insert(Solution)
+        .values(
+            [
+                {
+                    "id": generate_id(),
+                    "user_id": user_id,
+                    "api_key_id": "test-key",
+                    "title": f"test solution {i}",
+                    "error_message": "error",
+                    "error_type": "runtime",
+                    "context": "context",
+                    "root_cause": "root cause",
+                    "solution": "solution",
+                    "tags": [],
+                }
+                for i in range(count)
+            ]
+        )
+        .returning(Solution)
+    )
+    rows = list(res.scalars().all())
+    await db.commit()
+    return rows
+
+
+async def _delete_solutions(db, user_id: str) -> None:
+    await db.execute(delete(Solution).where(Solution.user_id == user_id))
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_paginate_totals(db):
+    owner = str(uuid.uuid4())
+    await _insert_solutions(db, owner, 3)
+    conditions = [Solution.user_id == owner]
+    try:
+        total, items = await _paginate(db, conditions, limit=2, offset=0)
+        assert (total, len(items)) == (3, 2)
+
+        total, items = await _paginate(db, conditions, limit=2, offset=2)
+        assert (total, len(items)) == (3, 1)
+
+        # Empty pages carry no row with the window count and fall back to a count query.
+        assert await _paginate(db, conditions, limit=2, offset=10) == (3, [])
+        assert await _paginate(db, conditions, limit=0, offset=0) == (3, [])
+    finally:
+        await _delete_solutions(db, owner)
+
+
+@pytest.mark.asyncio
+async def test_paginate_no_matches(db):
+    conditions = [Solution.user_id == str(uuid.uuid4())]
+    assert await _paginate(db, conditions, limit=10, offset=0) == (0, [])
+    assert await _paginate(db, conditions, limit=10, offset=10) == (0, [])
+
+
+@pytest.mark.asyncio
+async def test_vote_counters(db):
+    owner = str(uuid.uuid4())
+    voter = str(uuid.uuid4())
+    (solution,) = await _insert_solutions(db, owner, 1)
+    try:
+        # Insert: the new vote's column goes up.
+        await set_solution_vote(db, solution, voter, 1)
+        assert (solution.upvotes, solution.downvotes) == (1, 0)
+
+        # Re-casting the same vote is a no-op.
+        await set_solution_vote(db, solution, voter, 1)
+        assert (solution.upvotes, solution.downvotes) == (1, 0)
+        assert await get_solution_vote(db, solution.id, voter) == 1
+
+        # Flip: moves one count from upvotes to downvotes.
+        await set_solution_vote(db, solution, voter, -1)
+        assert (solution.upvotes, solution.downvotes) == (0, 1)
+        assert await get_solution_vote(db, solution.id, voter) == -1
+
+        await clear_solution_vote(db, solution, voter)
+        assert (solution.upvotes, solution.downvotes) == (0, 0)
+        assert await get_solution_vote(db, solution.id, voter) is None
+
+        # Clearing again finds nothing to remove.
+        await clear_solution_vote(db, solution, voter)
+        assert (solution.upvotes, solution.downvotes) == (0, 0)
+
+        # The in-memory counters match what was committed.
+        await db.refresh(solution)
+        assert (solution.upvotes, solution.downvotes) == (0, 0)
+    finally:
+        await _delete_solutions(db, owner)
+
+
+@pytest.mark.asyncio
+async def test_vote_counters_across_voters(db):
+    owner = str(uuid.uuid4())
+    (solution,) = await _insert_solutions(db, owner, 1)
+    try:
+        await set_solution_vote(db, solution, str(uuid.uuid4()), 1)
+        await set_solution_vote(db, solution, str(uuid.uuid4()), 1)
+        await set_solution_vote(db, solution, str(uuid.uuid4()), -1)
+        await db.refresh(solution)
+        assert (solution.upvotes, solution.downvotes) == (2, 1)
+    finally:
+        await _delete_solutions(db, owner)
+
+
+@pytest.mark.asyncio
+async def test_vote_rejects_own_solution_and_bad_values(db):
+    owner = str(uuid.uuid4())
+    (solution,) = await _insert_solutions(db, owner, 1)
+    try:
+        with pytest.raises(ValueError):
+            await set_solution_vote(db, solution, owner, 1)
+        with pytest.raises(ValueError):
+            await set_solution_vote(db, solution, str(uuid.uuid4()), 2)
+    finally:
+        await _delete_solutions(db, owner)
@@ -17,6 +17,10 @@ class TextData(BaseModel):
     text: str
 
 
+class TextBatch(BaseModel):
+    texts: list[str]
+
+
 @app.get("/health")
 def health_check() -> dict:
     return {"status": "ok"}
@@ -28,5 +32,12 @@ def get_embedding(data: TextData) -> dict:
     return {"embedding": vector}
 
 
+@app.post("/embed/batch")
+def get_embeddings(data: TextBatch) -> dict:
+    # One encode call lets the model run the whole batch together.
+    vectors = model.encode(data.texts).tolist() if data.texts else []
+    return {"embeddings": vectors}
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=PORT)